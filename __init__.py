@@ -7,5 +7,5 @@ from . import world
 from body import Body
 from collide import Contact
 from joint import Joint
-from math_utils import cross
+from math_utils import cross, cross_ss, cross_sv, cross_vs, cross_vv
 from world import World
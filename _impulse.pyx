@@ -0,0 +1,100 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, initializedcheck=False
+"""
+Copyright (c) 2006-2007 Erin Catto http://www.gphysics.com
+
+Permission to use, copy, modify, distribute and sell this software
+and its documentation for any purpose is hereby granted without fee,
+provided that the above copyright notice appear in all copies.
+Erin Catto makes no representations about the suitability
+of this software for any purpose.
+It is provided "as is" without express or implied warranty.
+"""
+from cython cimport floating
+
+
+cdef inline void apply_contact_impulse(floating[:, ::1] velocity, floating[::1] angular_velocity,
+                                       floating[::1] inv_mass, floating[::1] inv_I,
+                                       Py_ssize_t i1, Py_ssize_t i2,
+                                       double r1_x, double r1_y, double r2_x, double r2_y,
+                                       double P_x, double P_y) noexcept nogil:
+    velocity[i1, 0] -= inv_mass[i1] * P_x
+    velocity[i1, 1] -= inv_mass[i1] * P_y
+    angular_velocity[i1] -= inv_I[i1] * (r1_x * P_y - r1_y * P_x)
+
+    velocity[i2, 0] += inv_mass[i2] * P_x
+    velocity[i2, 1] += inv_mass[i2] * P_y
+    angular_velocity[i2] += inv_I[i2] * (r2_x * P_y - r2_y * P_x)
+
+
+def apply_impulse(floating[:, ::1] velocity, floating[::1] angular_velocity,
+                  Py_ssize_t[::1] body_1_idx, Py_ssize_t[::1] body_2_idx,
+                  floating[:, ::1] normal, floating[:, ::1] tangent,
+                  floating[:, ::1] r1, floating[:, ::1] r2,
+                  floating[::1] mass_normal, floating[::1] mass_tangent, floating[::1] bias,
+                  floating[::1] friction, floating[::1] Pn, floating[::1] Pt,
+                  floating[::1] inv_mass, floating[::1] inv_I,
+                  bint accumulate_impulses) -> None:
+    """One Gauss-Seidel pass over all contacts, in order (see ContactSolver).
+    All float arrays must share one dtype, float32 or float64.
+    """
+    cdef Py_ssize_t i, i1, i2
+    cdef double r1_x, r1_y, r2_x, r2_y
+    cdef double dv_x, dv_y, vn, d_Pn, Pn_0, vt, d_Pt, max_Pt, Pt_0
+
+    with nogil:
+        for i in range(normal.shape[0]):
+            i1 = body_1_idx[i]
+            i2 = body_2_idx[i]
+            r1_x = r1[i, 0]
+            r1_y = r1[i, 1]
+            r2_x = r2[i, 0]
+            r2_y = r2[i, 1]
+
+            # relative velocity at contact
+            dv_x = (velocity[i2, 0] - angular_velocity[i2] * r2_y
+                    - velocity[i1, 0] + angular_velocity[i1] * r1_y)
+            dv_y = (velocity[i2, 1] + angular_velocity[i2] * r2_x
+                    - velocity[i1, 1] - angular_velocity[i1] * r1_x)
+
+            # compute normal impulse
+            vn = dv_x * normal[i, 0] + dv_y * normal[i, 1]
+            d_Pn = mass_normal[i] * (-vn + bias[i])
+
+            if accumulate_impulses:
+                # clamp the accumulated impulse
+                Pn_0 = Pn[i]
+                Pn[i] = max(Pn_0 + d_Pn, 0.0)
+                d_Pn = Pn[i] - Pn_0
+            else:
+                d_Pn = max(d_Pn, 0.0)
+
+            # apply contact impulse
+            apply_contact_impulse(velocity, angular_velocity, inv_mass, inv_I, i1, i2,
+                                  r1_x, r1_y, r2_x, r2_y,
+                                  d_Pn * normal[i, 0], d_Pn * normal[i, 1])
+
+            # relative velocity at contact
+            dv_x = (velocity[i2, 0] - angular_velocity[i2] * r2_y
+                    - velocity[i1, 0] + angular_velocity[i1] * r1_y)
+            dv_y = (velocity[i2, 1] + angular_velocity[i2] * r2_x
+                    - velocity[i1, 1] - angular_velocity[i1] * r1_x)
+
+            vt = dv_x * tangent[i, 0] + dv_y * tangent[i, 1]
+            d_Pt = mass_tangent[i] * (-vt)
+
+            if accumulate_impulses:
+                # compute friction impulse
+                max_Pt = friction[i] * Pn[i]
+
+                # clamp friction
+                Pt_0 = Pt[i]
+                Pt[i] = max(-max_Pt, min(Pt_0 + d_Pt, max_Pt))
+                d_Pt = Pt[i] - Pt_0
+            else:
+                max_Pt = friction[i] * d_Pn
+                d_Pt = max(-max_Pt, min(d_Pt, max_Pt))
+
+            # apply contact impulses
+            apply_contact_impulse(velocity, angular_velocity, inv_mass, inv_I, i1, i2,
+                                  r1_x, r1_y, r2_x, r2_y,
+                                  d_Pt * tangent[i, 0], d_Pt * tangent[i, 1])
@@ -8,35 +8,24 @@ Erin Catto makes no representations about the suitability
 of this software for any purpose.
 It is provided "as is" without express or implied warranty.
 """
-from copy import copy
+import math
 
 import numpy as np
-from typing import Sequence
+from typing import Sequence, Tuple
 
 from body import Body
 from collide import Contact, collide
-from math_utils import cross
 from settings import ACCUMULATE_IMPULSES, POSITION_CORRECTION, WARM_STARTING
 
 
-class ArbiterKey:
-    """Use as a key for a dictionary of Arbiters.
-    Evaluates to same if contained bodies are the same.
-    """
-    def __init__(self, body_1: Body, body_2: Body) -> None:
-        # define consistent ordering for attributes
-        if id(body_1) < id(body_2):
-            self.body_1 = body_1
-            self.body_2 = body_2
-        else:
-            self.body_1 = body_2
-            self.body_2 = body_1
+# contacts may penetrate this deep before position correction pushes them apart
+K_ALLOWED_PENETRATION = 0.01
+# fraction of the penetration that is corrected per step
+K_BIAS_FACTOR = 0.2
 
-    def __eq__(self, other: 'ArbiterKey') -> bool:
-        return self.body_1 == other.body_1 and self.body_2 == other.body_2
 
-    def __hash__(self) -> int:
-        return hash((self.body_1, self.body_2))
+# Key of an Arbiter in a dictionary: the ids of its two bodies in ascending order.
+ArbiterKey = Tuple[int, int]
 
 
 class Arbiter:
@@ -50,7 +39,7 @@ class Arbiter:
 
         self.contacts = collide(self.body_1, self.body_2)
 
-        self.friction = np.sqrt(self.body_1.friction * self.body_2.friction)
+        self.friction = math.sqrt(self.body_1.friction * self.body_2.friction)
 
     @property
     def num_contacts(self):
@@ -58,79 +47,103 @@ class Arbiter:
 
     def update(self, new_contacts: Sequence[Contact]) -> None:
         merged_contacts = []
-        # TODO Can maybe optimize this matching/search process using a dict?
+        old_contacts = {c.edges: c for c in self.contacts}
         for c_new in new_contacts:
-            c_old = None
-            for c_old in self.contacts:
-                if c_new.edges == c_old.edges:
-                    break
+            c_old = old_contacts.get(c_new.edges)
 
+            # the new contacts come from a fresh collide() call and are not shared,
+            #  so they are taken over as they are
             if c_old is not None:
-                c = copy(c_new)  # TODO is this copy needed?
-                merged_contacts.append(c)
                 if WARM_STARTING:
-                    c.Pn = c_old.Pn
-                    c.Pt = c_old.Pt
-                    c.Pnb = c_old.Pnb
+                    c_new.Pn = c_old.Pn
+                    c_new.Pt = c_old.Pt
+                    c_new.Pnb = c_old.Pnb
                 else:
-                    c.Pn = 0.0
-                    c.Pt = 0.0
-                    c.Pnb = 0.0
-            else:
-                merged_contacts.append(copy(c_new))  # TODO is this copy needed?
+                    c_new.Pn = 0.0
+                    c_new.Pt = 0.0
+                    c_new.Pnb = 0.0
+            merged_contacts.append(c_new)
 
         self.contacts = merged_contacts
 
     def pre_step(self, inv_dt: float) -> None:
-        k_allowed_penetration = 0.01
-        k_bias_factor = 0.2 if POSITION_CORRECTION else 0.0
-
-        for c in self.contacts:
-            r1 = c.position - self.body_1.position
-            r2 = c.position - self.body_2.position
-
-            # precompute normal mass, tangent mass, and bias
-            rn1 = r1 @ c.normal
-            rn2 = r2 @ c.normal
-            k_normal = self.body_1.inv_mass + self.body_2.inv_mass
-            k_normal += (self.body_1.inv_I * ((r1 @ r1) - rn1 * rn1)
-                         + self.body_2.inv_I * ((r2 @ r2) - rn2 * rn2))
-            c.mass_normal = 1.0 / k_normal
-
-            tangent = cross(c.normal, 1.0)
-            rt1 = r1 @ tangent
-            rt2 = r2 @ tangent
-            k_tangent = self.body_1.inv_mass + self.body_2.inv_mass
-            k_tangent += (self.body_1.inv_I * ((r1 @ r1) - rt1 * rt1)
-                          + self.body_2.inv_I * ((r2 @ r2) - rt2 * rt2))
-            c.mass_tangent = 1.0 / k_tangent
-
-            c.bias = -k_bias_factor * inv_dt * min(0.0, c.separation + k_allowed_penetration)
-
-            if ACCUMULATE_IMPULSES:
-                # apply normal + friction impulse
-                P = c.Pn * c.normal + c.Pt * tangent
+        k_bias_factor = K_BIAS_FACTOR if POSITION_CORRECTION else 0.0
 
-                self.body_1.velocity -= self.body_1.inv_mass * P
-                self.body_1.angular_velocity -= self.body_1.inv_I * cross(r1, P)
+        b1 = self.body_1
+        b2 = self.body_2
 
-                self.body_2.velocity += self.body_2.inv_mass * P
-                self.body_2.angular_velocity += self.body_2.inv_I * cross(r2, P)
+        # gather the contacts into (n, 2) / (n,) arrays and precompute all of them at once
+        positions = np.array([c.position for c in self.contacts])
+        normals = np.array([c.normal for c in self.contacts])
+        separations = np.array([c.separation for c in self.contacts])
+        tangents = np.stack((normals[:, 1], -normals[:, 0]), axis=1)
+
+        r1 = positions - b1.position
+        r2 = positions - b2.position
+        r1_sq = np.einsum('ij,ij->i', r1, r1)
+        r2_sq = np.einsum('ij,ij->i', r2, r2)
+
+        # precompute normal mass, tangent mass, and bias
+        rn1 = np.einsum('ij,ij->i', r1, normals)
+        rn2 = np.einsum('ij,ij->i', r2, normals)
+        k_normal = (b1.inv_mass + b2.inv_mass
+                    + b1.inv_I * (r1_sq - rn1 * rn1) + b2.inv_I * (r2_sq - rn2 * rn2))
+
+        rt1 = np.einsum('ij,ij->i', r1, tangents)
+        rt2 = np.einsum('ij,ij->i', r2, tangents)
+        k_tangent = (b1.inv_mass + b2.inv_mass
+                     + b1.inv_I * (r1_sq - rt1 * rt1) + b2.inv_I * (r2_sq - rt2 * rt2))
+
+        bias = -k_bias_factor * inv_dt * np.minimum(0.0, separations + K_ALLOWED_PENETRATION)
+
+        for c, mass_normal, mass_tangent, c_bias in zip(
+                self.contacts, (1.0 / k_normal).tolist(), (1.0 / k_tangent).tolist(), bias.tolist()):
+            c.mass_normal = mass_normal
+            c.mass_tangent = mass_tangent
+            c.bias = c_bias
+
+        # the bodies do not move during the impulse iterations, so the lever arms and
+        #  tangents are computed here once and kept as floats for the scalar loop of
+        #  apply_impulse, one row per contact:
+        #  r1_x, r1_y, r2_x, r2_y, normal_x, normal_y, tangent_x, tangent_y
+        self._contact_floats = np.hstack((r1, r2, normals, tangents)).tolist()
+
+        if ACCUMULATE_IMPULSES:
+            # apply normal + friction impulse of all contacts
+            Pn = np.array([c.Pn for c in self.contacts])
+            Pt = np.array([c.Pt for c in self.contacts])
+            P = Pn[:, None] * normals + Pt[:, None] * tangents
+
+            b1.velocity -= b1.inv_mass * P.sum(axis=0)
+            b1.angular_velocity -= b1.inv_I * float(np.sum(r1[:, 0] * P[:, 1] - r1[:, 1] * P[:, 0]))
+
+            b2.velocity += b2.inv_mass * P.sum(axis=0)
+            b2.angular_velocity += b2.inv_I * float(np.sum(r2[:, 0] * P[:, 1] - r2[:, 1] * P[:, 0]))
 
     def apply_impulse(self) -> None:
         b1 = self.body_1
         b2 = self.body_2
 
-        for c in self.contacts:
-            c.r1 = c.position - b1.position
-            c.r2 = c.position - b2.position
-
+        # only the two bodies of this arbiter change here, so their velocities are
+        #  kept in floats for the whole loop and written back once at the end.
+        #  The cross products are written out, calling compiled kernels from
+        #  Python costs more than the arithmetic.
+        v1_x, v1_y = b1.velocity.tolist()
+        v2_x, v2_y = b2.velocity.tolist()
+        w1 = b1.angular_velocity
+        w2 = b2.angular_velocity
+        inv_mass_1 = b1.inv_mass
+        inv_mass_2 = b2.inv_mass
+        inv_I_1 = b1.inv_I
+        inv_I_2 = b2.inv_I
+
+        for c, (r1_x, r1_y, r2_x, r2_y, n_x, n_y, t_x, t_y) in zip(self.contacts, self._contact_floats):
             # relative velocity at contact
-            dv = (b2.velocity + cross(b2.angular_velocity, c.r2)
-                  - b1.velocity - cross(b1.angular_velocity, c.r1))
+            dv_x = v2_x - w2 * r2_y - v1_x + w1 * r1_y
+            dv_y = v2_y + w2 * r2_x - v1_y - w1 * r1_x
 
             # compute normal impulse
-            vn = dv @ c.normal
+            vn = dv_x * n_x + dv_y * n_y
 
             d_Pn = c.mass_normal * (-vn + c.bias)
 
@@ -143,20 +156,22 @@ class Arbiter:
                 d_Pn = max(d_Pn, 0.0)
 
             # apply contact impulse
-            Pn = d_Pn * c.normal
+            P_x = d_Pn * n_x
+            P_y = d_Pn * n_y
 
-            b1.velocity -= b1.inv_mass * Pn
-            b1.angular_velocity -= b1.inv_I * cross(c.r1, Pn)
+            v1_x -= inv_mass_1 * P_x
+            v1_y -= inv_mass_1 * P_y
+            w1 -= inv_I_1 * (r1_x * P_y - r1_y * P_x)
 
-            b2.velocity += b2.inv_mass * Pn
-            b2.angular_velocity += b2.inv_I * cross(c.r2, Pn)
+            v2_x += inv_mass_2 * P_x
+            v2_y += inv_mass_2 * P_y
+            w2 += inv_I_2 * (r2_x * P_y - r2_y * P_x)
 
             # relative velocity at contact
-            dv = (b2.velocity + cross(b2.angular_velocity, c.r2)
-                  - b1.velocity - cross(b1.angular_velocity, c.r1))
+            dv_x = v2_x - w2 * r2_y - v1_x + w1 * r1_y
+            dv_y = v2_y + w2 * r2_x - v1_y - w1 * r1_x
 
-            tangent = cross(c.normal, 1.0)
-            vt = dv @ tangent
+            vt = dv_x * t_x + dv_y * t_y
             d_Pt = c.mass_tangent * (-vt)
 
             if ACCUMULATE_IMPULSES:
@@ -165,27 +180,34 @@ class Arbiter:
 
                 # clamp friction
                 old_tangent_impulse = c.Pt
-                c.Pt = np.clip(old_tangent_impulse + d_Pt, -max_Pt, max_Pt)
+                c.Pt = max(-max_Pt, min(old_tangent_impulse + d_Pt, max_Pt))
                 d_Pt = c.Pt - old_tangent_impulse
             else:
                 max_Pt = self.friction * d_Pn
-                d_Pt = np.clip(d_Pt, -max_Pt, max_Pt)
+                d_Pt = max(-max_Pt, min(d_Pt, max_Pt))
 
             # apply contact impulses
-            Pt = d_Pt * tangent
+            P_x = d_Pt * t_x
+            P_y = d_Pt * t_y
+
+            v1_x -= inv_mass_1 * P_x
+            v1_y -= inv_mass_1 * P_y
+            w1 -= inv_I_1 * (r1_x * P_y - r1_y * P_x)
 
-            b1.velocity -= b1.inv_mass * Pt
-            b1.angular_velocity -= b1.inv_I * cross(c.r1, Pt)
+            v2_x += inv_mass_2 * P_x
+            v2_y += inv_mass_2 * P_y
+            w2 += inv_I_2 * (r2_x * P_y - r2_y * P_x)
 
-            b2.velocity += b2.inv_mass * Pt
-            b2.angular_velocity += b2.inv_I * cross(c.r2, Pt)
+        b1.velocity = (v1_x, v1_y)
+        b1.angular_velocity = w1
+        b2.velocity = (v2_x, v2_y)
+        b2.angular_velocity = w2
 
 
 if __name__ == '__main__':
     b1 = Body(np.array([1, 2]))
     b2 = Body(np.array([3, 4]))
     a = Arbiter(b1, b2)
-    ak1 = ArbiterKey(b1, b2)
-    ak2 = ArbiterKey(b2, b1)
-    d = {ak1: a}
-    assert ak1 in d and ak2 in d and hash(ak1) == hash(ak2) and ak1 == ak2
+    ak = (id(a.body_1), id(a.body_2))
+    d = {ak: a}
+    assert ak in d and ak[0] < ak[1]
@@ -8,29 +8,81 @@ Erin Catto makes no representations about the suitability
 of this software for any purpose.
 It is provided "as is" without express or implied warranty.
 """
-from typing import Sequence, Union
+import math
+from typing import Sequence, Tuple, Union
 
 import numpy as np
 
 
-DTYPE = float
+DTYPE = np.float32
+
+
+class BodyArrays:
+    """Structure-of-arrays storage for the state of a group of bodies.
+
+    Row `i` holds the state of one body. The arrays grow by doubling, so rows
+    must be accessed through the arrays of this object and not kept around.
+    """
+    _FIELDS = ('positions', 'velocities', 'forces', 'rotations',
+               'angular_velocities', 'torques', 'inv_mass', 'inv_I', 'half_widths')
+
+    def __init__(self, capacity: int = 1, dtype=DTYPE) -> None:
+        self.size = 0
+        self.positions = np.zeros((capacity, 2), dtype=dtype)
+        self.velocities = np.zeros((capacity, 2), dtype=dtype)
+        self.forces = np.zeros((capacity, 2), dtype=dtype)
+        self.rotations = np.zeros(capacity, dtype=dtype)
+        self.angular_velocities = np.zeros(capacity, dtype=dtype)
+        self.torques = np.zeros(capacity, dtype=dtype)
+        self.inv_mass = np.zeros(capacity, dtype=dtype)
+        self.inv_I = np.zeros(capacity, dtype=dtype)
+        self.half_widths = np.zeros((capacity, 2), dtype=dtype)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.positions)
+
+    def add(self) -> int:
+        """Append a zeroed row and return its index."""
+        if self.size == self.capacity:
+            for name in self._FIELDS:
+                old = getattr(self, name)
+                new = np.zeros((max(2 * len(old), 1),) + old.shape[1:], dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+
+        self.size += 1
+        return self.size - 1
+
+    def copy_row(self, other: 'BodyArrays', src: int, dst: int) -> None:
+        for name in self._FIELDS:
+            getattr(self, name)[dst] = getattr(other, name)[src]
+
+    def remove(self, idx: int) -> None:
+        """Remove row `idx`, moving the following rows up by one."""
+        for name in self._FIELDS:
+            a = getattr(self, name)
+            a[idx:self.size - 1] = a[idx + 1:self.size]
+            a[self.size - 1] = 0
+
+        self.size -= 1
 
 
 class Body:
+    """A box. Its state lives in a row of a `BodyArrays`: its own until it is moved
+    into the arrays of a World with `move_state`.
+    """
     def __init__(self,
                  width: Union[np.ndarray, Sequence[float]] = np.zeros(2, dtype=DTYPE),
                  mass: float = float('inf')) -> None:
-        self.width = np.asarray(width)
-        self.mass = mass
+        self._state = BodyArrays()
+        self._idx = self._state.add()
 
-        self.position = np.zeros(2, dtype=self.width.dtype)
-        self.rotation = 0.0
+        self.width = width
+        self.mass = float(mass)
 
-        self.velocity = np.zeros(2, dtype=self.width.dtype)
-        self.angular_velocity = 0.0
-
-        self.force = np.zeros(2, dtype=self.width.dtype)
-        self.torque = 0.0
+        self._R = np.eye(2, dtype=self.width.dtype)
+        self._R_rotation = 0.0
 
         self.friction = 0.2
 
@@ -43,11 +95,138 @@ class Body:
             self.I = float('inf')
             self.inv_I = 0.0
 
+        self.aabb_min: Tuple[float, float] = (0.0, 0.0)
+        self.aabb_max: Tuple[float, float] = (0.0, 0.0)
+        self.update_aabb()
+
+    @property
+    def index(self) -> int:
+        """Row of the body in its state arrays."""
+        return self._idx
+
+    def move_state(self, state: BodyArrays) -> None:
+        """Copy the state of the body into a new row of `state` and use that from now on."""
+        idx = state.add()
+        state.copy_row(self._state, self._idx, idx)
+        self._state = state
+        self._idx = idx
+
+    def detach_state(self) -> None:
+        """Move the state of the body back into arrays of its own."""
+        self.move_state(BodyArrays(dtype=self._state.positions.dtype))
+
+    def shift_index(self, offset: int) -> None:
+        """Follow the row of the body after rows before it were removed from its state arrays."""
+        self._idx += offset
+
+    @property
+    def width(self) -> np.ndarray:
+        return self._width
+
+    @width.setter
+    def width(self, width: Union[np.ndarray, Sequence[float]]) -> None:
+        # the half widths in the state arrays and the corners follow the width, so
+        #  assign a new width rather than changing it in place. The mass and inertia
+        #  are not recomputed
+        self._width = np.asarray(width, dtype=DTYPE)
+        self._state.half_widths[self._idx] = 0.5 * self._width
+
+        # corners relative to the center in the body frame, counter-clockwise
+        self._corner_offsets = 0.5 * np.array([[-1.0, -1.0],
+                                               [1.0, -1.0],
+                                               [1.0, 1.0],
+                                               [-1.0, 1.0]], dtype=self._width.dtype) * self._width
+
+    # vector properties return views into the state arrays, so in place updates
+    #  such as `body.velocity += dv` write through
+
+    @property
+    def position(self) -> np.ndarray:
+        return self._state.positions[self._idx]
+
+    @position.setter
+    def position(self, position: np.ndarray) -> None:
+        self._state.positions[self._idx] = position
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._state.velocities[self._idx]
+
+    @velocity.setter
+    def velocity(self, velocity: np.ndarray) -> None:
+        self._state.velocities[self._idx] = velocity
+
+    @property
+    def force(self) -> np.ndarray:
+        return self._state.forces[self._idx]
+
+    @force.setter
+    def force(self, force: np.ndarray) -> None:
+        self._state.forces[self._idx] = force
+
+    @property
+    def rotation(self) -> float:
+        return self._state.rotations.item(self._idx)
+
+    @rotation.setter
+    def rotation(self, rotation: float) -> None:
+        self._state.rotations[self._idx] = rotation
+
+    @property
+    def angular_velocity(self) -> float:
+        return self._state.angular_velocities.item(self._idx)
+
+    @angular_velocity.setter
+    def angular_velocity(self, angular_velocity: float) -> None:
+        self._state.angular_velocities[self._idx] = angular_velocity
+
+    @property
+    def torque(self) -> float:
+        return self._state.torques.item(self._idx)
+
+    @torque.setter
+    def torque(self, torque: float) -> None:
+        self._state.torques[self._idx] = torque
+
+    @property
+    def inv_mass(self) -> float:
+        return self._state.inv_mass.item(self._idx)
+
+    @inv_mass.setter
+    def inv_mass(self, inv_mass: float) -> None:
+        self._state.inv_mass[self._idx] = inv_mass
+
+    @property
+    def inv_I(self) -> float:
+        return self._state.inv_I.item(self._idx)
+
+    @inv_I.setter
+    def inv_I(self, inv_I: float) -> None:
+        self._state.inv_I[self._idx] = inv_I
+
     def add_force(self, f: np.ndarray) -> None:
         self.force += f
 
     def rotation_matrix(self) -> np.ndarray:
-        c = np.cos(self.rotation)
-        s = np.sin(self.rotation)
-        return np.array([[c, -s],
-                         [s, c]], dtype=self.width.dtype)
+        """Rotation matrix of the body, cached for the angle it was computed at.
+        The returned array is shared, do not modify it in place.
+        """
+        rotation = self.rotation
+        if rotation != self._R_rotation:
+            c = math.cos(rotation)
+            s = math.sin(rotation)
+            self._R = np.array([[c, -s],
+                                [s, c]], dtype=self.width.dtype)
+            self._R_rotation = rotation
+        return self._R
+
+    def vertices(self) -> np.ndarray:
+        """World coordinates of the four corners as a (4, 2) array."""
+        return self._corner_offsets @ self.rotation_matrix().T + self.position
+
+    def update_aabb(self) -> None:
+        """Recompute the axis-aligned bounding box from the current position and rotation."""
+        R = self.rotation_matrix()
+        extent = np.abs(R) @ (0.5 * self.width)
+        self.aabb_min = tuple((self.position - extent).tolist())
+        self.aabb_max = tuple((self.position + extent).tolist())
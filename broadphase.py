@@ -0,0 +1,257 @@
+"""
+Broadphase: find the pairs of bodies whose bounding boxes overlap.
+
+The pair finders expect the bounding boxes to be up to date and skip pairs of two
+static bodies, which never collide. sweep_and_prune and SpatialHashGrid take the
+boxes as (n, 2) arrays and the static bodies as a mask, in the order of the bodies
+(see World.broadphase), or gather them from the bodies (see Body.update_aabb).
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from body import Body
+
+
+# below this many bodies the sweep is cheaper than filling the grid
+GRID_MIN_BODIES = 32
+
+
+def aabb_overlaps(aabb_min: np.ndarray, aabb_max: np.ndarray,
+                  i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Overlap mask of the boxes of all index pairs (i, j) at once, touching boxes overlap."""
+    return ((aabb_max[i, 0] >= aabb_min[j, 0]) & (aabb_min[i, 0] <= aabb_max[j, 0])
+            & (aabb_max[i, 1] >= aabb_min[j, 1]) & (aabb_min[i, 1] <= aabb_max[j, 1]))
+
+
+def _aabb_arrays(bodies: Sequence[Body], aabb_min: Optional[np.ndarray],
+                 aabb_max: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    if aabb_min is None or aabb_max is None:
+        aabb_min = np.array([b.aabb_min for b in bodies]).reshape(-1, 2)
+        aabb_max = np.array([b.aabb_max for b in bodies]).reshape(-1, 2)
+    return aabb_min, aabb_max
+
+
+def _static_mask(bodies: Sequence[Body], static: Optional[np.ndarray]) -> np.ndarray:
+    if static is None:
+        static = np.array([b.inv_mass == 0.0 for b in bodies], dtype=bool)
+    return static
+
+
+def _ranges(start: np.ndarray, stop: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (row, index) for every index in range(start[row], stop[row]) of every row
+    counts = np.maximum(stop - start, 0)
+    rows = np.repeat(np.arange(len(start)), counts)
+    index = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts) + start[rows]
+    return rows, index
+
+
+def _body_pairs(bodies: Sequence[Body], aabb_min: np.ndarray, aabb_max: np.ndarray,
+                i: np.ndarray, j: np.ndarray) -> List[Tuple[Body, Body]]:
+    # keep the candidate pairs that overlap
+    keep = aabb_overlaps(aabb_min, aabb_max, i, j)
+    return [(bodies[k], bodies[l]) for k, l in zip(i[keep].tolist(), j[keep].tolist())]
+
+
+def sweep_and_prune(bodies: Sequence[Body], aabb_min: Optional[np.ndarray] = None,
+                    aabb_max: Optional[np.ndarray] = None,
+                    static: Optional[np.ndarray] = None) -> List[Tuple[Body, Body]]:
+    aabb_min, aabb_max = _aabb_arrays(bodies, aabb_min, aabb_max)
+    static = _static_mask(bodies, static)
+
+    # sort along x: the boxes overlapping box k on x are the ones after it whose
+    #  aabb_min[0] does not exceed its aabb_max[0], a contiguous range of the order
+    order = np.argsort(aabb_min[:, 0], kind='stable')
+    stop = np.searchsorted(aabb_min[order, 0], aabb_max[order, 0], side='right')
+    static_sorted = static[order]
+    dynamic_k = np.flatnonzero(~static_sorted)
+    static_k = np.flatnonzero(static_sorted)
+
+    # candidate pairs (k, l) in sorted positions: a dynamic box with every box in
+    #  k < l < stop[k], a static box only with the dynamic boxes in that range
+    rows, l_dynamic = _ranges(dynamic_k + 1, stop[dynamic_k])
+    k_dynamic = dynamic_k[rows]
+    rows, m = _ranges(np.searchsorted(dynamic_k, static_k, side='right'),
+                      np.searchsorted(dynamic_k, stop[static_k], side='left'))
+    k_static = static_k[rows]
+    l_static = dynamic_k[m]
+
+    k = np.concatenate((k_dynamic, k_static))
+    l = np.concatenate((l_dynamic, l_static))
+
+    # the pairs are sorted by (k, l), which sets the order of the arbiters and so of
+    #  the Gauss-Seidel iterations. Every k is either dynamic or static and l already
+    #  increases for each k, so a stable sort on k is enough
+    pair_order = np.argsort(k, kind='stable')
+    k = k[pair_order]
+    l = l[pair_order]
+    return _body_pairs(bodies, aabb_min, aabb_max, order[k], order[l])
+
+
+class SpatialHashGrid:
+    """Uniform grid whose cells are hashed into a dictionary.
+
+    Each body is inserted into every cell its bounding box touches, and only bodies
+    sharing a cell are tested against each other. Unless `cell_size` is given it is
+    twice the mean extent of the dynamic bodies, recomputed on every call.
+
+    The cell lists are kept between calls and only emptied, so a steady scene does
+    not allocate new cells every step.
+    """
+    def __init__(self, cell_size: Optional[float] = None, min_cell_size: float = 0.5) -> None:
+        self.cell_size = cell_size
+        self.min_cell_size = min_cell_size
+
+        self._cells: Dict[int, List[int]] = {}
+        self._occupied: List[List[int]] = []
+
+    def auto_cell_size(self, bodies: Sequence[Body]) -> float:
+        total = 0.0
+        count = 0
+        for b in bodies:
+            if b.inv_mass > 0.0:
+                total += max(b.aabb_max[0] - b.aabb_min[0], b.aabb_max[1] - b.aabb_min[1])
+                count += 1
+
+        if count == 0:
+            return self.min_cell_size
+        return max(2.0 * total / count, self.min_cell_size)
+
+    def pairs(self, bodies: Sequence[Body], aabb_min: Optional[np.ndarray] = None,
+              aabb_max: Optional[np.ndarray] = None,
+              static: Optional[np.ndarray] = None) -> List[Tuple[Body, Body]]:
+        aabb_min, aabb_max = _aabb_arrays(bodies, aabb_min, aabb_max)
+        static = _static_mask(bodies, static).tolist()
+
+        for cell in self._occupied:
+            cell.clear()
+        self._occupied = []
+
+        # forget the cells of bodies that moved away once the table gets much larger
+        #  than the scene
+        if len(self._cells) > 64 * max(len(bodies), 16):
+            self._cells = {}
+
+        cells = self._cells
+        occupied = self._occupied
+        inv_cell_size = 1.0 / (self.cell_size or self.auto_cell_size(bodies))
+        cell_min = np.floor(aabb_min * inv_cell_size).astype(np.int64).tolist()
+        cell_max = np.floor(aabb_max * inv_cell_size).astype(np.int64).tolist()
+
+        for i, ((x_0, y_0), (x_1, y_1)) in enumerate(zip(cell_min, cell_max)):
+            for x in range(x_0, x_1 + 1):
+                for y in range(y_0, y_1 + 1):
+                    # distinct cells may share a hash, which only adds candidates
+                    key = (x * 73856093) ^ (y * 19349663)
+                    cell = cells.get(key)
+                    if cell is None:
+                        cell = cells[key] = []
+                    if not cell:
+                        occupied.append(cell)
+                    cell.append(i)
+
+        # bodies are inserted by increasing index, so i <= j within every cell
+        candidates = set()
+        for cell in occupied:
+            for k, i in enumerate(cell):
+                for j in cell[k + 1:]:
+                    if i != j and not (static[i] and static[j]):
+                        candidates.add((i, j))
+
+        if not candidates:
+            return []
+
+        # test all candidates at once
+        i, j = np.array(list(candidates), dtype=np.intp).T
+        return _body_pairs(bodies, aabb_min, aabb_max, i, j)
+
+
+class IncrementalSweepAndPrune:
+    """Sweep and prune that keeps its sorted x endpoints between calls.
+
+    Every body has a min and a max endpoint on the x axis. Bodies move little from
+    one step to the next, so re-sorting the endpoints of the previous step with an
+    insertion sort takes close to linear time. Each swap of a min endpoint with a
+    max endpoint starts or ends an overlap on x, which keeps the set of x-overlapping
+    pairs up to date without testing all pairs again. Only those pairs are then
+    tested on y.
+
+    The endpoints are rebuilt from scratch whenever the list of bodies changes.
+    """
+    def __init__(self) -> None:
+        self._body_ids: List[int] = []
+        # [x, is_max, body] per endpoint, sorted by (x, is_max) so that touching boxes overlap
+        self._endpoints: List[list] = []
+        self._overlaps: Dict[Tuple[int, int], Tuple[Body, Body]] = {}
+
+    def pairs(self, bodies: Sequence[Body]) -> List[Tuple[Body, Body]]:
+        body_ids = [id(b) for b in bodies]
+        if body_ids != self._body_ids:
+            self._rebuild(bodies)
+            self._body_ids = body_ids
+        else:
+            self._update()
+
+        static = {id(b) for b in bodies if b.inv_mass == 0.0}
+        pairs = []
+        for bi, bj in self._overlaps.values():
+            if id(bi) in static and id(bj) in static:
+                continue
+
+            if bi.aabb_max[1] < bj.aabb_min[1] or bi.aabb_min[1] > bj.aabb_max[1]:
+                continue
+
+            pairs.append((bi, bj))
+
+        return pairs
+
+    @staticmethod
+    def _pair_key(bi: Body, bj: Body) -> Tuple[int, int]:
+        return (id(bi), id(bj)) if id(bi) < id(bj) else (id(bj), id(bi))
+
+    def _rebuild(self, bodies: Sequence[Body]) -> None:
+        endpoints = []
+        for b in bodies:
+            endpoints.append([b.aabb_min[0], False, b])
+            endpoints.append([b.aabb_max[0], True, b])
+        endpoints.sort(key=lambda e: (e[0], e[1]))
+
+        overlaps = {}
+        active: Dict[int, Body] = {}
+        for _, is_max, b in endpoints:
+            if is_max:
+                del active[id(b)]
+            else:
+                for bj in active.values():
+                    overlaps[self._pair_key(b, bj)] = (b, bj)
+                active[id(b)] = b
+
+        self._endpoints = endpoints
+        self._overlaps = overlaps
+
+    def _update(self) -> None:
+        endpoints = self._endpoints
+        overlaps = self._overlaps
+
+        for e in endpoints:
+            b = e[2]
+            e[0] = b.aabb_max[0] if e[1] else b.aabb_min[0]
+
+        # insertion sort, tracking the overlaps that start or end with every swap
+        for k in range(1, len(endpoints)):
+            e = endpoints[k]
+            x, is_max, b = e
+            i = k - 1
+            while i >= 0 and (endpoints[i][0] > x or (endpoints[i][0] == x and endpoints[i][1] > is_max)):
+                other_is_max = endpoints[i][1]
+                if not is_max and other_is_max:
+                    # a min moves below a max: the boxes start overlapping on x
+                    other = endpoints[i][2]
+                    overlaps[self._pair_key(b, other)] = (b, other)
+                elif is_max and not other_is_max:
+                    # a max moves below a min: the boxes stop overlapping on x
+                    overlaps.pop(self._pair_key(b, endpoints[i][2]), None)
+
+                endpoints[i + 1] = endpoints[i]
+                i -= 1
+            endpoints[i + 1] = e
@@ -10,10 +10,10 @@ It is provided "as is" without express or implied warranty.
 """
 
 import numpy as np
-from enum import Enum
-from typing import Optional, Sequence, List, Union, Tuple
+from typing import List, Tuple
 
-from body import Body
+from body import Body, DTYPE
+from jit import njit
 
 
 """
@@ -38,6 +38,7 @@ class Contact:
 
         self.position: np.ndarray = None
         self.normal: np.ndarray = None
+        self.tangent: np.ndarray = None
         self.r1: np.ndarray = None
         self.r2: np.ndarray = None
 
@@ -49,263 +50,481 @@ class Contact:
         self.edges: Edges = None
 
 
-class Axis(Enum):
-    FACE_A_X = 1
-    FACE_A_Y = 2
-    FACE_B_X = 3
-    FACE_B_Y = 4
+# separating axes
+FACE_A_X = 1
+FACE_A_Y = 2
+FACE_B_X = 3
+FACE_B_Y = 4
 
+# edge numbers as plain ints, for use in the compiled collision code
+NO_EDGE = 0
+EDGE_1 = 1
+EDGE_2 = 2
+EDGE_3 = 3
+EDGE_4 = 4
 
-class EdgeNumbers(Enum):
-    NO_EDGE = 0
-    EDGE_1 = 1
-    EDGE_2 = 2
-    EDGE_3 = 3
-    EDGE_4 = 4
+
+@njit(cache=True)
+def pack_edges(in_edge_1: int, out_edge_1: int, in_edge_2: int, out_edge_2: int) -> int:
+    return (in_edge_1 << 12) | (out_edge_1 << 8) | (in_edge_2 << 4) | out_edge_2
+
+
+@njit(cache=True)
+def flip_edges(packed: int) -> int:
+    # swap (in_edge_1, out_edge_1) with (in_edge_2, out_edge_2)
+    return ((packed & 0xFF) << 8) | (packed >> 8)
 
 
 class Edges:
+    """Edge numbers of a contact point, packed into a single int with 4 bits per
+    edge number: in_edge_1, out_edge_1, in_edge_2, out_edge_2 (from high to low).
+    """
     def __init__(self,
-                 in_edge_1: EdgeNumbers = EdgeNumbers.NO_EDGE,
-                 out_edge_1: EdgeNumbers = EdgeNumbers.NO_EDGE,
-                 in_edge_2: EdgeNumbers = EdgeNumbers.NO_EDGE,
-                 out_edge_2: EdgeNumbers = EdgeNumbers.NO_EDGE) -> None:
-        self.in_edge_1 = in_edge_1
-        self.out_edge_1 = out_edge_1
-        self.in_edge_2 = in_edge_2
-        self.out_edge_2 = out_edge_2
+                 in_edge_1: int = NO_EDGE,
+                 out_edge_1: int = NO_EDGE,
+                 in_edge_2: int = NO_EDGE,
+                 out_edge_2: int = NO_EDGE) -> None:
+        self.packed = pack_edges(in_edge_1, out_edge_1, in_edge_2, out_edge_2)
+
+    @classmethod
+    def from_packed(cls, packed: int) -> 'Edges':
+        edges = cls.__new__(cls)
+        edges.packed = packed
+        return edges
+
+    @property
+    def in_edge_1(self) -> int:
+        return (self.packed >> 12) & 0xF
+
+    @property
+    def out_edge_1(self) -> int:
+        return (self.packed >> 8) & 0xF
+
+    @property
+    def in_edge_2(self) -> int:
+        return (self.packed >> 4) & 0xF
+
+    @property
+    def out_edge_2(self) -> int:
+        return self.packed & 0xF
 
     def __eq__(self, other: 'Edges') -> bool:
-        return (self.in_edge_1 == other.in_edge_1 and
-                self.out_edge_1 == other.out_edge_1 and
-                self.in_edge_2 == other.in_edge_2 and
-                self.out_edge_2 == other.out_edge_2)
+        return self.packed == other.packed
 
     def __hash__(self) -> int:
-        return hash((self.in_edge_1, self.out_edge_1, self.in_edge_2, self.out_edge_2))
+        return self.packed
 
     def flip(self) -> None:
-        self.in_edge_1, self.in_edge_2 = self.in_edge_2, self.in_edge_1
-        self.out_edge_1, self.out_edge_2 = self.out_edge_2, self.out_edge_1
+        self.packed = flip_edges(self.packed)
 
 
-class ClipVertex:
-    def __init__(self, v: Optional[np.ndarray] = None):
-        self.edges = Edges()
-        self.v = v
+_IDENTITY = np.eye(2, dtype=DTYPE)
 
+"""
+Clip vertices are stored as a pair of arrays:
+    v: (n, 2) vertex positions
+    e: (n, 4) edge numbers of each vertex (in_edge_1, out_edge_1, in_edge_2, out_edge_2)
+"""
 
-def clip_segment_to_line(v_in: Sequence[ClipVertex], normal: np.ndarray,
-                         offset: float, clip_edge: EdgeNumbers) -> List[ClipVertex]:
-    v_out = []
 
-    distance_0 = normal @ v_in[0].v - offset
-    distance_1 = normal @ v_in[1].v - offset
+@njit(cache=True, fastmath=True)
+def clip_segment_to_line(v_in: np.ndarray, e_in: np.ndarray, normal_x: float, normal_y: float,
+                         offset: float, clip_edge: int) -> Tuple[int, np.ndarray, np.ndarray]:
+    v_out = np.empty((2, 2), dtype=v_in.dtype)
+    e_out = np.zeros((2, 4), dtype=np.int64)
+    num_out = 0
+
+    distance_0 = normal_x * v_in[0, 0] + normal_y * v_in[0, 1] - offset
+    distance_1 = normal_x * v_in[1, 0] + normal_y * v_in[1, 1] - offset
 
     if distance_0 <= 0:
-        v_out.append(v_in[0])
+        v_out[num_out] = v_in[0]
+        e_out[num_out] = e_in[0]
+        num_out += 1
 
     if distance_1 <= 0:
-        v_out.append(v_in[1])
+        v_out[num_out] = v_in[1]
+        e_out[num_out] = e_in[1]
+        num_out += 1
 
     if distance_0 * distance_1 < 0:
         interp = distance_0 / (distance_0 - distance_1)
-        new_v = ClipVertex(v=v_in[0].v + interp * (v_in[1].v - v_in[0].v))
+        v_out[num_out, 0] = v_in[0, 0] + interp * (v_in[1, 0] - v_in[0, 0])
+        v_out[num_out, 1] = v_in[0, 1] + interp * (v_in[1, 1] - v_in[0, 1])
 
         if distance_0 > 0:
-            new_v.edges = v_in[0].edges
-            new_v.edges.in_edge_1 = clip_edge
-            new_v.edges.in_edge_2 = EdgeNumbers.NO_EDGE
+            e_out[num_out] = e_in[0]
+            e_out[num_out, 0] = clip_edge
+            e_out[num_out, 2] = NO_EDGE
         else:
-            new_v.edges = v_in[1].edges
-            new_v.edges.out_edge_1 = clip_edge
-            new_v.edges.out_edge_2 = EdgeNumbers.NO_EDGE
+            e_out[num_out] = e_in[1]
+            e_out[num_out, 1] = clip_edge
+            e_out[num_out, 3] = NO_EDGE
+
+        num_out += 1
 
-        v_out.append(new_v)
+    return num_out, v_out, e_out
 
-    assert len(v_out) <= 2
-    return v_out
 
+@njit(cache=True, fastmath=True)
+def compute_incident_edge(h: np.ndarray, pos: np.ndarray, rot: np.ndarray,
+                          normal_x: float, normal_y: float) -> Tuple[np.ndarray, np.ndarray]:
+    h_x = h[0]
+    h_y = h[1]
+    r00 = rot[0, 0]
+    r01 = rot[0, 1]
+    r10 = rot[1, 0]
+    r11 = rot[1, 1]
 
-def compute_incident_edge(h: np.ndarray, pos: np.ndarray,
-                          rot: np.ndarray, normal: np.ndarray) -> Tuple[ClipVertex, ClipVertex]:
-    c = (ClipVertex(), ClipVertex())
     # The normal is from the reference box.
     #  Convert it to the incident box's frame and flip sign.
-    rot_t = rot.transpose()
-    n = -(rot_t @ normal)
-    n_abs = np.abs(n)
-
-    if n_abs[0] > n_abs[1]:
-        if np.sign(n[0]) > 0:
-            c[0].v = np.array([h[0], -h[1]], dtype=h.dtype)
-            c[0].edges.in_edge_2 = EdgeNumbers.EDGE_3
-            c[0].edges.out_edge_2 = EdgeNumbers.EDGE_4
-
-            c[1].v = h.copy()
-            c[1].edges.in_edge_2 = EdgeNumbers.EDGE_4
-            c[1].edges.out_edge_2 = EdgeNumbers.EDGE_1
+    n_x = -(r00 * normal_x + r10 * normal_y)
+    n_y = -(r01 * normal_x + r11 * normal_y)
+
+    e = np.zeros((2, 4), dtype=np.int64)
+    if abs(n_x) > abs(n_y):
+        if n_x > 0:
+            v0_x, v0_y = h_x, -h_y
+            e[0, 2] = EDGE_3
+            e[0, 3] = EDGE_4
+
+            v1_x, v1_y = h_x, h_y
+            e[1, 2] = EDGE_4
+            e[1, 3] = EDGE_1
         else:
-            c[0].v = np.array([-h[0], h[1]], dtype=h.dtype)
-            c[0].edges.in_edge_2 = EdgeNumbers.EDGE_1
-            c[0].edges.out_edge_2 = EdgeNumbers.EDGE_2
+            v0_x, v0_y = -h_x, h_y
+            e[0, 2] = EDGE_1
+            e[0, 3] = EDGE_2
 
-            c[1].v = -h
-            c[1].edges.in_edge_2 = EdgeNumbers.EDGE_2
-            c[1].edges.out_edge_2 = EdgeNumbers.EDGE_3
+            v1_x, v1_y = -h_x, -h_y
+            e[1, 2] = EDGE_2
+            e[1, 3] = EDGE_3
     else:
-        if np.sign(n[1]) > 0:
-            c[0].v = h.copy()
-            c[0].edges.in_edge_2 = EdgeNumbers.EDGE_4
-            c[0].edges.out_edge_2 = EdgeNumbers.EDGE_1
-
-            c[1].v = np.array([-h[0], h[1]], dtype=h.dtype)
-            c[1].edges.in_edge_2 = EdgeNumbers.EDGE_1
-            c[1].edges.out_edge_2 = EdgeNumbers.EDGE_2
+        if n_y > 0:
+            v0_x, v0_y = h_x, h_y
+            e[0, 2] = EDGE_4
+            e[0, 3] = EDGE_1
+
+            v1_x, v1_y = -h_x, h_y
+            e[1, 2] = EDGE_1
+            e[1, 3] = EDGE_2
         else:
-            c[0].v = -h
-            c[0].edges.in_edge_2 = EdgeNumbers.EDGE_2
-            c[0].edges.out_edge_2 = EdgeNumbers.EDGE_3
+            v0_x, v0_y = -h_x, -h_y
+            e[0, 2] = EDGE_2
+            e[0, 3] = EDGE_3
+
+            v1_x, v1_y = h_x, -h_y
+            e[1, 2] = EDGE_3
+            e[1, 3] = EDGE_4
+
+    # pos + rot @ v
+    v = np.empty((2, 2), dtype=pos.dtype)
+    v[0, 0] = pos[0] + r00 * v0_x + r01 * v0_y
+    v[0, 1] = pos[1] + r10 * v0_x + r11 * v0_y
+    v[1, 0] = pos[0] + r00 * v1_x + r01 * v1_y
+    v[1, 1] = pos[1] + r10 * v1_x + r11 * v1_y
+    return v, e
+
+
+@njit(cache=True)
+def _no_contacts(pos: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # outputs of the collision kernels for separated boxes, in the dtype of the inputs
+    return (0, np.zeros(2, dtype=pos.dtype), np.empty((2, 2), dtype=pos.dtype),
+            np.empty(2, dtype=pos.dtype), np.zeros(2, dtype=np.int64))
+
+
+@njit(cache=True, fastmath=True)
+def collide_boxes(h_a: np.ndarray, pos_a: np.ndarray, rot_a: np.ndarray,
+                  h_b: np.ndarray, pos_b: np.ndarray, rot_b: np.ndarray
+                  ) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Box-box collision on raw arrays.
+
+    Returns the number of contact points, the contact normal and the positions (n, 2),
+    separations (n,) and packed edge numbers (n,) of the contact points.
+    The 2x2 products are written out as scalar arithmetic.
+    """
+    # setup
+    h_a_x = h_a[0]
+    h_a_y = h_a[1]
+    h_b_x = h_b[0]
+    h_b_y = h_b[1]
+
+    ra00 = rot_a[0, 0]
+    ra01 = rot_a[0, 1]
+    ra10 = rot_a[1, 0]
+    ra11 = rot_a[1, 1]
+    rb00 = rot_b[0, 0]
+    rb01 = rot_b[0, 1]
+    rb10 = rot_b[1, 0]
+    rb11 = rot_b[1, 1]
+
+    dp_x = pos_b[0] - pos_a[0]
+    dp_y = pos_b[1] - pos_a[1]
+
+    # d_a = rot_a.T @ dp, d_b = rot_b.T @ dp
+    d_a_x = ra00 * dp_x + ra10 * dp_y
+    d_a_y = ra01 * dp_x + ra11 * dp_y
+    d_b_x = rb00 * dp_x + rb10 * dp_y
+    d_b_y = rb01 * dp_x + rb11 * dp_y
+
+    # abs_C = abs(rot_a.T @ rot_b)
+    c00 = abs(ra00 * rb00 + ra10 * rb10)
+    c01 = abs(ra00 * rb01 + ra10 * rb11)
+    c10 = abs(ra01 * rb00 + ra11 * rb10)
+    c11 = abs(ra01 * rb01 + ra11 * rb11)
 
-            c[1].v = np.array([h[0], -h[1]], dtype=h.dtype)
-            c[1].edges.in_edge_2 = EdgeNumbers.EDGE_3
-            c[1].edges.out_edge_2 = EdgeNumbers.EDGE_4
+    # box a faces
+    face_a_x = abs(d_a_x) - h_a_x - (c00 * h_b_x + c01 * h_b_y)
+    face_a_y = abs(d_a_y) - h_a_y - (c10 * h_b_x + c11 * h_b_y)
+    if face_a_x > 0 or face_a_y > 0:
+        return _no_contacts(pos_a)
 
-    c[0].v = pos + rot @ c[0].v
-    c[1].v = pos + rot @ c[1].v
-    return c
+    # box b faces
+    face_b_x = abs(d_b_x) - (c00 * h_a_x + c10 * h_a_y) - h_b_x
+    face_b_y = abs(d_b_y) - (c01 * h_a_x + c11 * h_a_y) - h_b_y
+    if face_b_x > 0 or face_b_y > 0:
+        return _no_contacts(pos_a)
 
+    # find best axis
+    axis = FACE_A_X
+    separation = face_a_x
+    if d_a_x > 0:
+        n_x, n_y = ra00, ra10
+    else:
+        n_x, n_y = -ra00, -ra10
 
-def collide(body_a: Body, body_b: Body) -> List[Contact]:
-    # setup
-    h_a = 0.5 * body_a.width
-    h_b = 0.5 * body_b.width
+    relative_tol = 0.95
+    absolute_tol = 0.01
 
-    pos_a = body_a.position
-    pos_b = body_b.position
+    if face_a_y > relative_tol * separation + absolute_tol * h_a_y:
+        axis = FACE_A_Y
+        separation = face_a_y
+        if d_a_y > 0:
+            n_x, n_y = ra01, ra11
+        else:
+            n_x, n_y = -ra01, -ra11
 
-    rot_a = body_a.rotation_matrix()
-    rot_b = body_b.rotation_matrix()
+    if face_b_x > relative_tol * separation + absolute_tol * h_b_x:
+        axis = FACE_B_X
+        separation = face_b_x
+        if d_b_x > 0:
+            n_x, n_y = rb00, rb10
+        else:
+            n_x, n_y = -rb00, -rb10
 
-    rot_a_t = rot_a.transpose()
-    rot_b_t = rot_b.transpose()
+    if face_b_y > relative_tol * separation + absolute_tol * h_b_y:
+        axis = FACE_B_Y
+        separation = face_b_y
+        if d_b_y > 0:
+            n_x, n_y = rb01, rb11
+        else:
+            n_x, n_y = -rb01, -rb11
 
-    dp = pos_b - pos_a
-    d_a = rot_a_t @ dp
-    d_b = rot_b_t @ dp
+    # setup clipping plane data based on the separating axis
+    # compute the clipping lines and the line segment to be clipped
+    if axis == FACE_A_X:
+        front_x, front_y = n_x, n_y
+        front = pos_a[0] * front_x + pos_a[1] * front_y + h_a_x
+        side_x, side_y = ra01, ra11
+        side = pos_a[0] * side_x + pos_a[1] * side_y
+        neg_side = -side + h_a_y
+        pos_side = side + h_a_y
+        neg_edge = EDGE_3
+        pos_edge = EDGE_1
+        incident_v, incident_e = compute_incident_edge(h_b, pos_b, rot_b, front_x, front_y)
+
+    elif axis == FACE_A_Y:
+        front_x, front_y = n_x, n_y
+        front = pos_a[0] * front_x + pos_a[1] * front_y + h_a_y
+        side_x, side_y = ra00, ra10
+        side = pos_a[0] * side_x + pos_a[1] * side_y
+        neg_side = -side + h_a_x
+        pos_side = side + h_a_x
+        neg_edge = EDGE_2
+        pos_edge = EDGE_4
+        incident_v, incident_e = compute_incident_edge(h_b, pos_b, rot_b, front_x, front_y)
+
+    elif axis == FACE_B_X:
+        front_x, front_y = -n_x, -n_y
+        front = pos_b[0] * front_x + pos_b[1] * front_y + h_b_x
+        side_x, side_y = rb01, rb11
+        side = pos_b[0] * side_x + pos_b[1] * side_y
+        neg_side = -side + h_b_y
+        pos_side = side + h_b_y
+        neg_edge = EDGE_3
+        pos_edge = EDGE_1
+        incident_v, incident_e = compute_incident_edge(h_a, pos_a, rot_a, front_x, front_y)
 
-    C = rot_a_t @ rot_b
-    abs_C = np.abs(C)
-    abs_C_t = abs_C.transpose()
+    else:
+        front_x, front_y = -n_x, -n_y
+        front = pos_b[0] * front_x + pos_b[1] * front_y + h_b_y
+        side_x, side_y = rb00, rb10
+        side = pos_b[0] * side_x + pos_b[1] * side_y
+        neg_side = -side + h_b_x
+        pos_side = side + h_b_x
+        neg_edge = EDGE_2
+        pos_edge = EDGE_4
+        incident_v, incident_e = compute_incident_edge(h_a, pos_a, rot_a, front_x, front_y)
+
+    return _clip_incident_edge(axis, n_x, n_y, front_x, front_y, front, side_x, side_y,
+                               neg_side, pos_side, neg_edge, pos_edge, incident_v, incident_e)
+
+
+@njit(cache=True, fastmath=True)
+def collide_aligned_boxes(h_a: np.ndarray, pos_a: np.ndarray,
+                          h_b: np.ndarray, pos_b: np.ndarray
+                          ) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Same as collide_boxes for two boxes with zero rotation.
+
+    Both rotation matrices are the identity, so the box frames coincide with the world
+    frame and the face separations of box a and box b are the same.
+    """
+    # setup
+    h_a_x = h_a[0]
+    h_a_y = h_a[1]
+    h_b_x = h_b[0]
+    h_b_y = h_b[1]
 
-    # box a faces
-    face_a = np.abs(d_a) - h_a - abs_C @ h_b
-    if face_a[0] > 0 or face_a[1] > 0:
-        return []
+    dp_x = pos_b[0] - pos_a[0]
+    dp_y = pos_b[1] - pos_a[1]
 
-    # box b faces
-    face_b = np.abs(d_b) - abs_C_t @ h_a - h_b
-    if face_b[0] > 0 or face_b[1] > 0:
-        return []
+    # box a and box b faces
+    face_x = abs(dp_x) - h_a_x - h_b_x
+    face_y = abs(dp_y) - h_a_y - h_b_y
+    if face_x > 0 or face_y > 0:
+        return _no_contacts(pos_a)
 
     # find best axis
-    axis = Axis.FACE_A_X
-    separation = face_a[0]
-    normal = rot_a[:, 0] if d_a[0] > 0 else -rot_a[:, 0]
+    axis = FACE_A_X
+    separation = face_x
+    n_x, n_y = (1.0 if dp_x > 0 else -1.0), 0.0
 
     relative_tol = 0.95
     absolute_tol = 0.01
 
-    if face_a[1] > relative_tol * separation + absolute_tol * h_a[1]:
-        axis = Axis.FACE_A_Y
-        separation = face_a[1]
-        normal = rot_a[:, 1] if d_a[1] > 0 else -rot_a[:, 1]
-
+    if face_y > relative_tol * separation + absolute_tol * h_a_y:
+        axis = FACE_A_Y
+        separation = face_y
+        n_x, n_y = 0.0, (1.0 if dp_y > 0 else -1.0)
 
-    if face_b[0] > relative_tol * separation + absolute_tol * h_b[0]:
-        axis = Axis.FACE_B_X
-        separation = face_b[0]
-        normal = rot_b[:, 0] if d_b[0] > 0 else -rot_b[:, 0]
+    if face_x > relative_tol * separation + absolute_tol * h_b_x:
+        axis = FACE_B_X
+        separation = face_x
+        n_x, n_y = (1.0 if dp_x > 0 else -1.0), 0.0
 
-    if face_b[1] > relative_tol * separation + absolute_tol * h_b[1]:
-        axis = Axis.FACE_B_Y
-        separation = face_b[1]
-        normal = rot_b[:, 1] if d_b[1] > 0 else -rot_b[:, 1]
+    if face_y > relative_tol * separation + absolute_tol * h_b_y:
+        axis = FACE_B_Y
+        separation = face_y
+        n_x, n_y = 0.0, (1.0 if dp_y > 0 else -1.0)
 
     # setup clipping plane data based on the separating axis
     # compute the clipping lines and the line segment to be clipped
-    if axis == Axis.FACE_A_X:
-        front_normal = normal
-        front = pos_a @ front_normal + h_a[0]
-        side_normal = rot_a[:, 1]
-        side = pos_a @ side_normal
-        neg_side = -side + h_a[1]
-        pos_side = side + h_a[1]
-        neg_edge = EdgeNumbers.EDGE_3
-        pos_edge = EdgeNumbers.EDGE_1
-        incident_edge = compute_incident_edge(h_b, pos_b, rot_b, front_normal)
-
-    elif axis == Axis.FACE_A_Y:
-        front_normal = normal
-        front = pos_a @ front_normal + h_a[1]
-        side_normal = rot_a[:, 0]
-        side = pos_a @ side_normal
-        neg_side = -side + h_a[0]
-        pos_side = side + h_a[0]
-        neg_edge = EdgeNumbers.EDGE_2
-        pos_edge = EdgeNumbers.EDGE_4
-        incident_edge = compute_incident_edge(h_b, pos_b, rot_b, front_normal)
-
-    elif axis == Axis.FACE_B_X:
-        front_normal = -normal
-        front = pos_b @ front_normal + h_b[0]
-        side_normal = rot_b[:, 1]
-        side = pos_b @ side_normal
-        neg_side = -side + h_b[1]
-        pos_side = side + h_b[1]
-        neg_edge = EdgeNumbers.EDGE_3
-        pos_edge = EdgeNumbers.EDGE_1
-        incident_edge = compute_incident_edge(h_a, pos_a, rot_a, front_normal)
-
-    elif axis == Axis.FACE_B_Y:
-        front_normal = -normal
-        front = pos_b @ front_normal + h_b[1]
-        side_normal = rot_b[:, 0]
-        side = pos_b @ side_normal
-        neg_side = -side + h_b[0]
-        pos_side = side + h_b[0]
-        neg_edge = EdgeNumbers.EDGE_2
-        pos_edge = EdgeNumbers.EDGE_4
-        incident_edge = compute_incident_edge(h_a, pos_a, rot_a, front_normal)
+    if axis == FACE_A_X:
+        front_x, front_y = n_x, n_y
+        front = pos_a[0] * front_x + h_a_x
+        side_x, side_y = 0.0, 1.0
+        neg_side = -pos_a[1] + h_a_y
+        pos_side = pos_a[1] + h_a_y
+        neg_edge = EDGE_3
+        pos_edge = EDGE_1
+        incident_v, incident_e = compute_incident_edge(h_b, pos_b, _IDENTITY, front_x, front_y)
+
+    elif axis == FACE_A_Y:
+        front_x, front_y = n_x, n_y
+        front = pos_a[1] * front_y + h_a_y
+        side_x, side_y = 1.0, 0.0
+        neg_side = -pos_a[0] + h_a_x
+        pos_side = pos_a[0] + h_a_x
+        neg_edge = EDGE_2
+        pos_edge = EDGE_4
+        incident_v, incident_e = compute_incident_edge(h_b, pos_b, _IDENTITY, front_x, front_y)
+
+    elif axis == FACE_B_X:
+        front_x, front_y = -n_x, -n_y
+        front = pos_b[0] * front_x + h_b_x
+        side_x, side_y = 0.0, 1.0
+        neg_side = -pos_b[1] + h_b_y
+        pos_side = pos_b[1] + h_b_y
+        neg_edge = EDGE_3
+        pos_edge = EDGE_1
+        incident_v, incident_e = compute_incident_edge(h_a, pos_a, _IDENTITY, front_x, front_y)
 
     else:
-        raise ValueError(f'Axis value set incorrectly ({axis}).')
+        front_x, front_y = -n_x, -n_y
+        front = pos_b[1] * front_y + h_b_y
+        side_x, side_y = 1.0, 0.0
+        neg_side = -pos_b[0] + h_b_x
+        pos_side = pos_b[0] + h_b_x
+        neg_edge = EDGE_2
+        pos_edge = EDGE_4
+        incident_v, incident_e = compute_incident_edge(h_a, pos_a, _IDENTITY, front_x, front_y)
+
+    return _clip_incident_edge(axis, n_x, n_y, front_x, front_y, front, side_x, side_y,
+                               neg_side, pos_side, neg_edge, pos_edge, incident_v, incident_e)
+
+
+@njit(cache=True, fastmath=True)
+def _clip_incident_edge(axis: int, n_x: float, n_y: float,
+                        front_x: float, front_y: float, front: float,
+                        side_x: float, side_y: float, neg_side: float, pos_side: float,
+                        neg_edge: int, pos_edge: int, incident_v: np.ndarray, incident_e: np.ndarray
+                        ) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    positions = np.empty((2, 2), dtype=incident_v.dtype)
+    separations = np.empty(2, dtype=incident_v.dtype)
+    edges = np.zeros(2, dtype=np.int64)
+
+    normal = np.empty(2, dtype=incident_v.dtype)
+    normal[0] = n_x
+    normal[1] = n_y
 
     # clip other face with 5 box planes (1 face plane, 4 edge planes)
     #  clip to box side 1
-    clip_points_1 = clip_segment_to_line(incident_edge, -side_normal, neg_side, neg_edge)
-    if len(clip_points_1) < 2:
-        return []
+    num_1, clip_v_1, clip_e_1 = clip_segment_to_line(incident_v, incident_e,
+                                                     -side_x, -side_y, neg_side, neg_edge)
+    if num_1 < 2:
+        return 0, normal, positions, separations, edges
 
     #  clip to negative box side 1
-    clip_points_2 = clip_segment_to_line(clip_points_1, side_normal, pos_side, pos_edge)
-    if len(clip_points_2) < 2:
-        return []
+    num_2, clip_v_2, clip_e_2 = clip_segment_to_line(clip_v_1, clip_e_1,
+                                                     side_x, side_y, pos_side, pos_edge)
+    if num_2 < 2:
+        return 0, normal, positions, separations, edges
 
-    # Now clipPoints2 contains the clipping points.
+    # Now clip_v_2 contains the clipping points.
     #  Due to roundoff, it is possible that clipping removes all points.
-    contacts = []
-    for cp in clip_points_2:
-        separation = front_normal @ cp.v - front
+    num_contacts = 0
+    for i in range(2):
+        separation = front_x * clip_v_2[i, 0] + front_y * clip_v_2[i, 1] - front
         if separation <= 0:
-            new_contact = Contact()
-            new_contact.separation = separation
-            new_contact.normal = normal
+            separations[num_contacts] = separation
             # slide contact point onto reference face (easy to cull)
-            new_contact.position = cp.v - separation * front_normal
-            new_contact.edges = cp.edges
-            if axis == Axis.FACE_B_X or axis == Axis.FACE_B_Y:
-                new_contact.edges.flip()
-            contacts.append(new_contact)
+            positions[num_contacts, 0] = clip_v_2[i, 0] - separation * front_x
+            positions[num_contacts, 1] = clip_v_2[i, 1] - separation * front_y
+            edges[num_contacts] = pack_edges(clip_e_2[i, 0], clip_e_2[i, 1],
+                                             clip_e_2[i, 2], clip_e_2[i, 3])
+            if axis == FACE_B_X or axis == FACE_B_Y:
+                edges[num_contacts] = flip_edges(edges[num_contacts])
+            num_contacts += 1
+
+    return num_contacts, normal, positions, separations, edges
+
+
+def collide(body_a: Body, body_b: Body) -> List[Contact]:
+    if body_a.rotation == 0.0 and body_b.rotation == 0.0:
+        num_contacts, normal, positions, separations, edges = collide_aligned_boxes(
+            0.5 * body_a.width, body_a.position, 0.5 * body_b.width, body_b.position)
+    else:
+        num_contacts, normal, positions, separations, edges = collide_boxes(
+            0.5 * body_a.width, body_a.position, body_a.rotation_matrix(),
+            0.5 * body_b.width, body_b.position, body_b.rotation_matrix())
+
+    contacts = []
+    for i, packed_edges in zip(range(num_contacts), edges.tolist()):
+        new_contact = Contact()
+        new_contact.separation = float(separations[i])
+        new_contact.normal = normal
+        new_contact.position = positions[i]
+        new_contact.edges = Edges.from_packed(packed_edges)
+        contacts.append(new_contact)
 
     return contacts
@@ -22,10 +22,14 @@ IMPULSE_ITERATIONS = 10
 GRAVITY = np.array([0.0, -10.0], dtype=DTYPE)
 
 
+SCREEN_OFFSET = np.array([SCREEN_OFFSET_X, SCREEN_OFFSET_Y], dtype=DTYPE)
+
+
 def to_screen(vertices):
-    return [(int((SCREEN_OFFSET_X + v[0]) * PPM),
-             SCREEN_HEIGHT - int((SCREEN_OFFSET_Y + v[1]) * PPM))
-            for v in vertices]
+    # truncate like int() and flip the y axis, all vertices at once
+    screen = ((SCREEN_OFFSET + np.asarray(vertices)) * PPM).astype(np.int32)
+    screen[:, 1] = SCREEN_HEIGHT - screen[:, 1]
+    return screen.tolist()
 
 
 # def to_world(vertices):
@@ -43,16 +47,7 @@ def draw_test(x: int, y: int, text: str) -> None:
 
 
 def draw_body(screen: pygame.Surface, body: Body) -> None:
-    R = body.rotation_matrix()
-    x = body.position
-    h = 0.5 * body.width
-
-    v1 = x + R @ -h
-    v2 = x + R @ np.array([h[0], -h[1]])
-    v3 = x + R @ h
-    v4 = x + R @ np.array([-h[0], h[1]])
-    vertices = to_screen((v1, v2, v3, v4))
-    # print(sum((v1, v2, v3, v4)) / 4, '->', sum(np.array(vertices)) / 4)
+    vertices = to_screen(body.vertices())
 
     if isinstance(body, Bomb):
         color = (102, 230, 102)
@@ -105,16 +100,12 @@ def draw_world(screen: pygame.Surface, world: World) -> None:
 
 def launch_bomb(world: World) -> None:
     # remove previous bomb
-    for i, b in enumerate(world.bodies):
-        if isinstance(b, Bomb):
-            del world.bodies[i]
-
-    world.arbiters = {key: arb for key, arb in world.arbiters.items()
-                      if not isinstance(arb.body_1, Bomb) and not isinstance(arb.body_2, Bomb)}
+    for b in [b for b in world.bodies if isinstance(b, Bomb)]:
+        world.remove_body(b)
 
     bomb = Bomb([3.0, 3.0], 50.0)
     bomb.friction = 0.2
-    bomb.position = np.array([np.random.rand() * 100 - 50, 50.0])
+    bomb.position = np.array([np.random.rand() * 100 - 50, 50.0], dtype=DTYPE)
     bomb.rotation = np.random.rand() * 3 - 1.5
     bomb.velocity = -1.5 * bomb.position
     bomb.angular_velocity = np.random.rand() * 40 - 20
@@ -204,11 +195,11 @@ def demo_1() -> World:
     world = World(gravity=GRAVITY, iterations=IMPULSE_ITERATIONS)
 
     body_1 = Body([100.0, 20.0])
-    body_1.position = np.array([0.0, 0.5 * body_1.width[1]])
+    body_1.position = np.array([0.0, 0.5 * body_1.width[1]], dtype=DTYPE)
     world.add_body(body_1)
 
     body_2 = Body([5.0, 5.0], 200.0)
-    body_2.position = np.array([0.0, 40.0])
+    body_2.position = np.array([0.0, 40.0], dtype=DTYPE)
     world.add_body(body_2)
 
     return world
@@ -218,13 +209,13 @@ def demo_2() -> World:
     world = World(gravity=GRAVITY, iterations=IMPULSE_ITERATIONS)
 
     body_1 = Body([100.0, 10.0])
-    body_1.position = np.array([0.0, 0.5 * body_1.width[1]])
+    body_1.position = np.array([0.0, 0.5 * body_1.width[1]], dtype=DTYPE)
     body_1.friction = 0.2
     body_1.rotation = 0.0
     world.add_body(body_1)
 
     body_2 = Body([5.0, 5.0], 100.0)
-    body_2.position = np.array([45.0, 60.0])
+    body_2.position = np.array([45.0, 60.0], dtype=DTYPE)
     body_2.friction = 0.2
     body_2.rotation = 0.0
     world.add_body(body_2)
@@ -239,7 +230,7 @@ def demo_3() -> World:
     world = World(gravity=GRAVITY, iterations=IMPULSE_ITERATIONS)
 
     body_1 = Body([100.0, 1.0])
-    body_1.position = np.array([0.0, 20.0])
+    body_1.position = np.array([0.0, 20.0], dtype=DTYPE)
     body_1.rotation = -0.25
     world.add_body(body_1)
 
@@ -247,7 +238,7 @@ def demo_3() -> World:
     for i, fric in enumerate(frictions):
         body = Body([3.0, 3.0], 25.0)
         body.friction = fric
-        body.position = np.array([-45.0 + 10.0 * i, 40.0])
+        body.position = np.array([-45.0 + 10.0 * i, 40.0], dtype=DTYPE)
         world.add_body(body)
 
     return world
@@ -257,14 +248,14 @@ def demo_4() -> World:
     world = World(gravity=GRAVITY, iterations=IMPULSE_ITERATIONS)
 
     body_1 = Body([100.0, 10.0])
-    body_1.position = np.array([0.0, 0.5 * body_1.width[1]])
+    body_1.position = np.array([0.0, 0.5 * body_1.width[1]], dtype=DTYPE)
     world.add_body(body_1)
 
     for i in range(8):
         body = Body([3.0, 3.0], 1.0)
         body.friction = 0.2
         x = np.random.rand() - 0.5
-        body.position = np.array([x, 12.0 + 3.5 * i])
+        body.position = np.array([x, 12.0 + 3.5 * i], dtype=DTYPE)
         world.add_body(body)
 
     return world
@@ -278,19 +269,19 @@ def demo_6() -> World:
     world = World(gravity=GRAVITY, iterations=IMPULSE_ITERATIONS)
 
     Ground = Body([100.0, 10.0])
-    Ground.position = np.array([0.0, 0.5 * Ground.width[1]])
+    Ground.position = np.array([0.0, 0.5 * Ground.width[1]], dtype=DTYPE)
     world.add_body(Ground)
 
     teeter = Body([60.0, 1.25], 100.0)
-    teeter.position = np.array([0.0, 15.0])
+    teeter.position = np.array([0.0, 15.0], dtype=DTYPE)
     world.add_body(teeter)
 
     small = Body([2.5, 2.5], 25.0)
-    small.position = np.array([-27.5, 20.0])
+    small.position = np.array([-27.5, 20.0], dtype=DTYPE)
     world.add_body(small)
     
     big = Body([5.0, 5.0], 100.0)
-    big.position = np.array([27.5, 85.0])
+    big.position = np.array([27.5, 85.0], dtype=DTYPE)
     world.add_body(big)
 
     j = Joint(Ground, teeter, teeter.position)
@@ -302,7 +293,7 @@ def demo_7() -> World:
     world = World(gravity=GRAVITY, iterations=IMPULSE_ITERATIONS)
 
     Ground = Body([100.0, 10.0])
-    Ground.position = np.array([0.0, 0.5 * Ground.width[1]])
+    Ground.position = np.array([0.0, 0.5 * Ground.width[1]], dtype=DTYPE)
     world.add_body(Ground)
 
     PLANK_COUNT = 15
@@ -317,7 +308,7 @@ def demo_7() -> World:
     planks = []
     for i in range(PLANK_COUNT):
         p = Body([PLANK_WIDTH, 0.25*5], PLANK_MASS)
-        p.position = np.array([deck_startx+PLANK_WIDTH/2+period*i, 25.0])
+        p.position = np.array([deck_startx+PLANK_WIDTH/2+period*i, 25.0], dtype=DTYPE)
         planks.append(p)
         world.add_body(p)
 
@@ -332,7 +323,7 @@ def demo_7() -> World:
 
     limbs = [Ground]+planks+[Ground]
     for i,(limb1,limb2) in enumerate(zip(limbs,limbs[1:])):
-        j = Joint(limb1, limb2, np.array([joint_startx+period*i, 25.0]))
+        j = Joint(limb1, limb2, np.array([joint_startx+period*i, 25.0], dtype=DTYPE))
         j.softness = softness
         j.bias_factor = bias_factor
         world.add_joint(j)
@@ -0,0 +1,21 @@
+"""
+Optional numba support.
+
+When numba is not installed `njit` returns the decorated function unchanged
+and `prange` is `range`, so the decorated code keeps working as plain Python.
+NUM_THREADS is the number of threads numba runs parallel loops on.
+"""
+
+try:
+    from numba import config, njit, prange
+    HAS_NUMBA = True
+    NUM_THREADS = config.NUMBA_NUM_THREADS
+except ImportError:
+    HAS_NUMBA = False
+    NUM_THREADS = 1
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -10,11 +10,12 @@ It is provided "as is" without express or implied warranty.
 """
 
 
+import math
+
 import numpy as np
 from typing import Optional
 
 from body import Body
-from math_utils import cross
 from settings import WARM_STARTING, POSITION_CORRECTION
 
 
@@ -23,13 +24,8 @@ class Joint:
                  body_1: Optional[Body] = None,
                  body_2: Optional[Body] = None,
                  anchor: Optional[np.ndarray] = None) -> None:
-        self.M = None
         self.P = None
 
-        self.r1 = None
-        self.r2 = None
-        self.bias = None
-
         self.softness = 0.0
         self.bias_factor = 0.2
 
@@ -40,51 +36,114 @@ class Joint:
             rot_2 = body_2.rotation_matrix()
             self.local_anchor_1 = rot_1.transpose() @ (anchor - body_1.position)
             self.local_anchor_2 = rot_2.transpose() @ (anchor - body_2.position)
+            self._local_anchors = (*self.local_anchor_1.tolist(), *self.local_anchor_2.tolist())
 
+            # filled in place by apply_impulse
             self.P = np.zeros(2, dtype=body_1.width.dtype)
 
     def pre_step(self, inv_dt: float) -> None:
-        rot_1 = self.body_1.rotation_matrix()
-        rot_2 = self.body_2.rotation_matrix()
-
-        r1 = self.r1 = rot_1 @ self.local_anchor_1
-        r2 = self.r2 = rot_2 @ self.local_anchor_2
-
-        K1 = np.array([[self.body_1.inv_mass + self.body_2.inv_mass, 0.0],
-                       [0.0, self.body_1.inv_mass + self.body_2.inv_mass]])
-        K2 = np.array([[self.body_1.inv_I * r1[1] * r1[1], -self.body_1.inv_I * r1[0] * r1[1]],
-                       [-self.body_1.inv_I * r1[0] * r1[1], self.body_1.inv_I * r1[0] * r1[0]]])
-        K3 = np.array([[self.body_2.inv_I * r2[1] * r2[1], -self.body_2.inv_I * r2[0] * r2[1]],
-                       [-self.body_2.inv_I * r2[0] * r2[1], self.body_2.inv_I * r2[0] * r2[0]]])
-        K = K1 + K2 + K3 + np.eye(2) * self.softness
-        self.M = np.linalg.inv(K)
-
-        p1 = self.body_1.position + r1
-        p2 = self.body_2.position + r2
-        dp = p2 - p1
+        # rotate the local anchors on floats, the rotation matrices of the bodies are
+        #  not needed here
+        a1_x, a1_y, a2_x, a2_y = self._local_anchors
+        rotation_1 = self.body_1.rotation
+        rotation_2 = self.body_2.rotation
+        c1 = math.cos(rotation_1)
+        s1 = math.sin(rotation_1)
+        c2 = math.cos(rotation_2)
+        s2 = math.sin(rotation_2)
+        r1_x = c1 * a1_x - s1 * a1_y
+        r1_y = s1 * a1_x + c1 * a1_y
+        r2_x = c2 * a2_x - s2 * a2_y
+        r2_y = s2 * a2_x + c2 * a2_y
+        self._lever_arms = (r1_x, r1_y, r2_x, r2_y)
+
+        inv_mass_1 = self.body_1.inv_mass
+        inv_mass_2 = self.body_2.inv_mass
+        inv_I_1 = self.body_1.inv_I
+        inv_I_2 = self.body_2.inv_I
+        self._inv_masses = (inv_mass_1, inv_I_1, inv_mass_2, inv_I_2)
+        inv_mass = inv_mass_1 + inv_mass_2
+
+        # K = (inv_mass_1 + inv_mass_2) * eye(2) + inv_I_1 * [[r1.y * r1.y, -r1.x * r1.y],
+        #                                                     [-r1.x * r1.y, r1.x * r1.x]]
+        #     + (same for body 2) + softness * eye(2)
+        k00 = inv_mass + inv_I_1 * r1_y * r1_y + inv_I_2 * r2_y * r2_y + self.softness
+        k01 = -inv_I_1 * r1_x * r1_y - inv_I_2 * r2_x * r2_y
+        k11 = inv_mass + inv_I_1 * r1_x * r1_x + inv_I_2 * r2_x * r2_x + self.softness
+
+        # K is symmetric, invert it in closed form. The adjugate over the determinant is
+        #  what a 2x2 solve computes too, there is nothing to gain from factoring K.
+        #  K is singular only when neither body can move, then no impulse is applied.
+        det = k00 * k11 - k01 * k01
+        inv_det = 1.0 / det if det != 0.0 else 0.0
+        M00 = k11 * inv_det
+        M01 = -k01 * inv_det
+        M11 = k00 * inv_det
 
         if POSITION_CORRECTION:
-            self.bias = -self.bias_factor * inv_dt * dp
+            # bias = -bias_factor * inv_dt * (p2 - p1) with p = position + r
+            p1_x, p1_y = self.body_1.position.tolist()
+            p2_x, p2_y = self.body_2.position.tolist()
+            bias_scale = -self.bias_factor * inv_dt
+            b_x = bias_scale * (p2_x + r2_x - p1_x - r1_x)
+            b_y = bias_scale * (p2_y + r2_y - p1_y - r1_y)
         else:
-            self.bias = np.zeros(2, dtype=self.body_1.width.dtype)
+            b_x = b_y = 0.0
+
+        # M and bias are fixed for the iterations, keep M and M @ bias as floats
+        self._M_coefficients = (M00, M01, M11)
+        self._M_bias = (M00 * b_x + M01 * b_y, M01 * b_x + M11 * b_y)
 
         if WARM_STARTING:
-            self.body_1.velocity -= self.body_1.inv_mass * self.P
-            self.body_1.angular_velocity -= self.body_1.inv_I * cross(r1, self.P)
-            self.body_2.velocity += self.body_2.inv_mass * self.P
-            self.body_2.angular_velocity += self.body_2.inv_I * cross(r2, self.P)
+            P_x, P_y = self.P.tolist()
+            self._apply_body_impulses(P_x, P_y)
         else:
-            self.P = np.zeros(2, dtype=self.body_1.width.dtype)
+            self.P.fill(0.0)
+
+    def _apply_body_impulses(self, P_x: float, P_y: float) -> None:
+        # apply -P to body 1 and P to body 2, all on floats
+        b1 = self.body_1
+        b2 = self.body_2
+        r1_x, r1_y, r2_x, r2_y = self._lever_arms
+        inv_mass_1, inv_I_1, inv_mass_2, inv_I_2 = self._inv_masses
+
+        v1_x, v1_y = b1.velocity.tolist()
+        v2_x, v2_y = b2.velocity.tolist()
+        b1.velocity = (v1_x - inv_mass_1 * P_x, v1_y - inv_mass_1 * P_y)
+        b1.angular_velocity -= inv_I_1 * (r1_x * P_y - r1_y * P_x)
+        b2.velocity = (v2_x + inv_mass_2 * P_x, v2_y + inv_mass_2 * P_y)
+        b2.angular_velocity += inv_I_2 * (r2_x * P_y - r2_y * P_x)
 
     def apply_impulse(self) -> None:
-        dv = (self.body_2.velocity + cross(self.body_2.angular_velocity, self.r2)
-            - self.body_1.velocity - cross(self.body_1.angular_velocity, self.r1))
-
-        impulse = self.M @ (self.bias - dv - self.softness * self.P)
-
-        self.body_1.velocity -= self.body_1.inv_mass * impulse
-        self.body_1.angular_velocity -= self.body_1.inv_I * cross(self.r1, impulse)
-        self.body_2.velocity += self.body_2.inv_mass * impulse
-        self.body_2.angular_velocity += self.body_2.inv_I * cross(self.r2, impulse)
-
-        self.P += impulse
+        b1 = self.body_1
+        b2 = self.body_2
+        r1_x, r1_y, r2_x, r2_y = self._lever_arms
+        inv_mass_1, inv_I_1, inv_mass_2, inv_I_2 = self._inv_masses
+        M00, M01, M11 = self._M_coefficients
+        M_bias_x, M_bias_y = self._M_bias
+
+        # everything is done on floats, the cross products are written out
+        v1_x, v1_y = b1.velocity.tolist()
+        v2_x, v2_y = b2.velocity.tolist()
+        w1 = b1.angular_velocity
+        w2 = b2.angular_velocity
+        P = self.P
+        P_x, P_y = P.tolist()
+
+        # dv = v2 + cross(w2, r2) - v1 - cross(w1, r1)
+        dv_x = v2_x - w2 * r2_y - v1_x + w1 * r1_y
+        dv_y = v2_y + w2 * r2_x - v1_y - w1 * r1_x
+
+        # impulse = M @ (bias - dv - softness * P) = M @ bias - M @ (dv + softness * P)
+        rhs_x = dv_x + self.softness * P_x
+        rhs_y = dv_y + self.softness * P_y
+        impulse_x = M_bias_x - (M00 * rhs_x + M01 * rhs_y)
+        impulse_y = M_bias_y - (M01 * rhs_x + M11 * rhs_y)
+
+        b1.velocity = (v1_x - inv_mass_1 * impulse_x, v1_y - inv_mass_1 * impulse_y)
+        b1.angular_velocity = w1 - inv_I_1 * (r1_x * impulse_y - r1_y * impulse_x)
+        b2.velocity = (v2_x + inv_mass_2 * impulse_x, v2_y + inv_mass_2 * impulse_y)
+        b2.angular_velocity = w2 + inv_I_2 * (r2_x * impulse_y - r2_y * impulse_x)
+
+        P[0] = P_x + impulse_x
+        P[1] = P_y + impulse_y
@@ -2,17 +2,41 @@ import numpy as np
 from typing import Union
 
 
+def cross_vv(a: np.ndarray, b: np.ndarray) -> float:
+    # a and b are 2D vectors, the arithmetic is cheaper on floats than on numpy scalars
+    a_x, a_y = a.tolist()
+    b_x, b_y = b.tolist()
+    return a_x * b_y - a_y * b_x
+
+
+def cross_vs(a: np.ndarray, b: float) -> np.ndarray:
+    # a is 2D vector, b is scalar
+    a_x, a_y = a.tolist()
+    return np.array((b * a_y, -b * a_x), dtype=a.dtype)
+
+
+def cross_sv(a: float, b: np.ndarray) -> np.ndarray:
+    # b is 2D vector, a is scalar
+    b_x, b_y = b.tolist()
+    return np.array((-a * b_y, a * b_x), dtype=b.dtype)
+
+
+def cross_ss(a: float, b: float) -> float:
+    # a and b are scalars
+    return a * b
+
+
 def cross(a: Union[np.ndarray, float], b: Union[np.ndarray, float]) -> Union[np.ndarray, float]:
+    """Cross product of any combination of 2D vectors and scalars.
+    Checks the argument types on every call, call sites that know them should use
+    cross_vv, cross_vs, cross_sv or cross_ss instead.
+    """
     if isinstance(a, np.ndarray) and a.shape[0] == 2:
         if isinstance(b, np.ndarray) and b.shape[0] == 2:
-            # a and b are 2D vectors
-            return np.cross(a, b)
+            return cross_vv(a, b)
         else:
-            # a is 2D vector, b is scalar
-            return np.array((b * a[1], -b * a[0]), dtype=a.dtype)
+            return cross_vs(a, b)
     elif isinstance(b, np.ndarray) and b.shape[0] == 2:
-        # b is 2D vector, a is scalar
-        return np.array((-a * b[1], a * b[0]), dtype=b.dtype)
+        return cross_sv(a, b)
     else:
-        # a and b are scalars
-        return a * b
+        return cross_ss(a, b)
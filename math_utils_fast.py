@@ -0,0 +1,34 @@
+"""
+Scalar versions of the cross products in math_utils.
+
+Vectors are passed as separate x and y floats and returned as tuples, so no
+arrays are created. The functions are compiled with numba when it is available
+and are cheap to call from other compiled functions.
+"""
+from typing import Tuple
+
+from jit import njit
+
+
+@njit(cache=True, fastmath=True)
+def cross_vv(a_x: float, a_y: float, b_x: float, b_y: float) -> float:
+    # a and b are 2D vectors
+    return a_x * b_y - a_y * b_x
+
+
+@njit(cache=True, fastmath=True)
+def cross_vs(a_x: float, a_y: float, b: float) -> Tuple[float, float]:
+    # a is 2D vector, b is scalar
+    return b * a_y, -b * a_x
+
+
+@njit(cache=True, fastmath=True)
+def cross_sv(a: float, b_x: float, b_y: float) -> Tuple[float, float]:
+    # b is 2D vector, a is scalar
+    return -a * b_y, a * b_x
+
+
+@njit(cache=True, fastmath=True)
+def cross_ss(a: float, b: float) -> float:
+    # a and b are scalars
+    return a * b
@@ -1,3 +1,15 @@
 ACCUMULATE_IMPULSES = True
 WARM_STARTING = True
 POSITION_CORRECTION = True
+BATCH_CONTACTS = True
+BATCH_JOINTS = True
+
+# solve the islands of bodies that do not touch each other in parallel, needs numba
+PARALLEL_ISLANDS = True
+
+# number of steps the impulses of a separated contact are kept for warm starting
+IMPULSE_CACHE_STEPS = 10
+
+# broadphase pair finder: 'sap' (sort and sweep), 'incremental' (sort and sweep keeping the
+#  order between steps) or 'grid' (spatial hash grid)
+BROADPHASE = 'sap'
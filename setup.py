@@ -0,0 +1,16 @@
+"""
+Builds the optional Cython contact solver kernel (_impulse.pyx) in place:
+
+    python setup.py build_ext --inplace
+
+The simulation runs without it, see solver.py.
+"""
+from Cython.Build import cythonize
+from setuptools import Extension, setup
+
+setup(
+    name='pybox2d-lite',
+    packages=[],
+    py_modules=[],
+    ext_modules=cythonize([Extension('_impulse', ['_impulse.pyx'])]),
+)
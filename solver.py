@@ -0,0 +1,691 @@
+"""
+Copyright (c) 2006-2007 Erin Catto http://www.gphysics.com
+
+Permission to use, copy, modify, distribute and sell this software
+and its documentation for any purpose is hereby granted without fee,
+provided that the above copyright notice appear in all copies.
+Erin Catto makes no representations about the suitability
+of this software for any purpose.
+It is provided "as is" without express or implied warranty.
+"""
+
+
+import functools
+
+import numpy as np
+from typing import List, Optional, Sequence, Set, Tuple
+
+from arbiter import K_ALLOWED_PENETRATION, K_BIAS_FACTOR, Arbiter
+from body import BodyArrays
+from jit import HAS_NUMBA, NUM_THREADS, njit, prange
+from joint import Joint
+from math_utils_fast import cross_sv, cross_vv
+from settings import ACCUMULATE_IMPULSES, PARALLEL_ISLANDS, POSITION_CORRECTION, WARM_STARTING
+
+try:
+    import _impulse
+except ImportError:  # the compiled kernel is optional, see setup.py
+    _impulse = None
+
+
+# below this many joints the per-joint solver is cheaper than building the batches
+JOINT_BATCH_MIN = 6
+
+# finding the islands only pays off when they can be solved on several threads
+SOLVE_ISLANDS = PARALLEL_ISLANDS and HAS_NUMBA and NUM_THREADS > 1
+
+
+def color_contacts(body_1_idx: Sequence[int], body_2_idx: Sequence[int],
+                   dynamic: Sequence[bool]) -> List[int]:
+    """Greedily assign each contact (or joint) a color such that no dynamic body
+    appears twice within the contacts of the same color.
+    """
+    colors = []
+    color_bodies: List[Set[int]] = []
+    for i1, i2 in zip(body_1_idx, body_2_idx):
+        needed = [i for i in (i1, i2) if dynamic[i]]
+        for color, used in enumerate(color_bodies):
+            if not any(i in used for i in needed):
+                break
+        else:
+            color = len(color_bodies)
+            color_bodies.append(set())
+
+        color_bodies[color].update(needed)
+        colors.append(color)
+
+    return colors
+
+
+def color_batches(colors: Sequence[int]) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """Order that sorts the items by color, and the (start, stop) slice of every color in it."""
+    colors = np.array(colors, dtype=np.intp)
+    # stable sort keeps the original order within each batch
+    order = np.argsort(colors, kind='stable')
+    counts = np.bincount(colors) if len(colors) else np.zeros(0, dtype=np.intp)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    return order, [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def relative_velocity(v: np.ndarray, w: np.ndarray, i1: np.ndarray, i2: np.ndarray,
+                      r1: np.ndarray, r2: np.ndarray) -> np.ndarray:
+    w1 = w[i1]
+    w2 = w[i2]
+    # v2 + cross(w2, r2) - v1 - cross(w1, r1)
+    return np.stack((v[i2, 0] - w2 * r2[:, 1] - v[i1, 0] + w1 * r1[:, 1],
+                     v[i2, 1] + w2 * r2[:, 0] - v[i1, 1] - w1 * r1[:, 0]), axis=1)
+
+
+def _rotate(angle: np.ndarray, v: np.ndarray) -> np.ndarray:
+    c = np.cos(angle)
+    s = np.sin(angle)
+    return np.stack((c * v[:, 0] - s * v[:, 1], s * v[:, 0] + c * v[:, 1]), axis=1)
+
+
+# Sequential passes compiled with numba, used when it is installed. They mirror the
+#  Cython kernel in _impulse.pyx and take the arrays of ContactSolver.kernel_arrays
+#  and JointSolver.kernel_arrays as tuples, and the indices of the contacts or joints
+#  to solve in order.
+
+@njit(cache=True, fastmath=True)
+def _apply_body_impulse(v, w, inv_mass, inv_I, i1, i2, r1_x, r1_y, r2_x, r2_y, P_x, P_y):
+    v[i1, 0] -= inv_mass[i1] * P_x
+    v[i1, 1] -= inv_mass[i1] * P_y
+    w[i1] -= inv_I[i1] * cross_vv(r1_x, r1_y, P_x, P_y)
+
+    v[i2, 0] += inv_mass[i2] * P_x
+    v[i2, 1] += inv_mass[i2] * P_y
+    w[i2] += inv_I[i2] * cross_vv(r2_x, r2_y, P_x, P_y)
+
+
+@njit(cache=True, fastmath=True)
+def _relative_velocity(v, w, i1, i2, r1_x, r1_y, r2_x, r2_y):
+    w2_x, w2_y = cross_sv(w[i2], r2_x, r2_y)
+    w1_x, w1_y = cross_sv(w[i1], r1_x, r1_y)
+    return v[i2, 0] + w2_x - v[i1, 0] - w1_x, v[i2, 1] + w2_y - v[i1, 1] - w1_y
+
+
+@njit(cache=True, fastmath=True)
+def contact_pass(v, w, inv_mass, inv_I, contacts, order, accumulate_impulses):
+    """One Gauss-Seidel pass over the contacts in order."""
+    i1s, i2s, normal, tangent, r1, r2, mass_normal, mass_tangent, bias, friction, Pn, Pt = contacts
+
+    for i in order:
+        i1 = i1s[i]
+        i2 = i2s[i]
+        r1_x = r1[i, 0]
+        r1_y = r1[i, 1]
+        r2_x = r2[i, 0]
+        r2_y = r2[i, 1]
+
+        # relative velocity at contact
+        dv_x, dv_y = _relative_velocity(v, w, i1, i2, r1_x, r1_y, r2_x, r2_y)
+
+        # compute normal impulse
+        vn = dv_x * normal[i, 0] + dv_y * normal[i, 1]
+        d_Pn = mass_normal[i] * (-vn + bias[i])
+
+        if accumulate_impulses:
+            # clamp the accumulated impulse
+            Pn_0 = Pn[i]
+            Pn[i] = max(Pn_0 + d_Pn, 0.0)
+            d_Pn = Pn[i] - Pn_0
+        else:
+            d_Pn = max(d_Pn, 0.0)
+
+        # apply contact impulse
+        _apply_body_impulse(v, w, inv_mass, inv_I, i1, i2, r1_x, r1_y, r2_x, r2_y,
+                            d_Pn * normal[i, 0], d_Pn * normal[i, 1])
+
+        # relative velocity at contact
+        dv_x, dv_y = _relative_velocity(v, w, i1, i2, r1_x, r1_y, r2_x, r2_y)
+
+        vt = dv_x * tangent[i, 0] + dv_y * tangent[i, 1]
+        d_Pt = mass_tangent[i] * (-vt)
+
+        if accumulate_impulses:
+            # compute friction impulse
+            max_Pt = friction[i] * Pn[i]
+
+            # clamp friction
+            Pt_0 = Pt[i]
+            Pt[i] = max(-max_Pt, min(Pt_0 + d_Pt, max_Pt))
+            d_Pt = Pt[i] - Pt_0
+        else:
+            max_Pt = friction[i] * d_Pn
+            d_Pt = max(-max_Pt, min(d_Pt, max_Pt))
+
+        # apply contact impulses
+        _apply_body_impulse(v, w, inv_mass, inv_I, i1, i2, r1_x, r1_y, r2_x, r2_y,
+                            d_Pt * tangent[i, 0], d_Pt * tangent[i, 1])
+
+
+@njit(cache=True, fastmath=True)
+def joint_pass(v, w, inv_mass, inv_I, joints, order):
+    """One Gauss-Seidel pass over the joints in order."""
+    i1s, i2s, r1, r2, M00, M01, M11, M_bias, softness, P = joints
+
+    for i in order:
+        i1 = i1s[i]
+        i2 = i2s[i]
+        r1_x = r1[i, 0]
+        r1_y = r1[i, 1]
+        r2_x = r2[i, 0]
+        r2_y = r2[i, 1]
+
+        dv_x, dv_y = _relative_velocity(v, w, i1, i2, r1_x, r1_y, r2_x, r2_y)
+
+        # impulse = M @ (bias - dv - softness * P) = M @ bias - M @ (dv + softness * P)
+        rhs_x = dv_x + softness[i] * P[i, 0]
+        rhs_y = dv_y + softness[i] * P[i, 1]
+        impulse_x = M_bias[i, 0] - (M00[i] * rhs_x + M01[i] * rhs_y)
+        impulse_y = M_bias[i, 1] - (M01[i] * rhs_x + M11[i] * rhs_y)
+
+        _apply_body_impulse(v, w, inv_mass, inv_I, i1, i2, r1_x, r1_y, r2_x, r2_y,
+                            impulse_x, impulse_y)
+
+        P[i, 0] += impulse_x
+        P[i, 1] += impulse_y
+
+
+@njit(cache=True, fastmath=True)
+def warm_start_pass(v, w, inv_mass, inv_I, i1s, i2s, r1, r2, P):
+    """Apply the accumulated impulses P, see warm_start."""
+    for i in range(len(i1s)):
+        _apply_body_impulse(v, w, inv_mass, inv_I, i1s[i], i2s[i],
+                            r1[i, 0], r1[i, 1], r2[i, 0], r2[i, 1], P[i, 0], P[i, 1])
+
+
+@njit(cache=True)
+def solve(iterations, v, w, inv_mass, inv_I, contacts, joints, accumulate_impulses):
+    """All impulse iterations: the contacts, then the joints, in every iteration."""
+    contact_order = np.arange(len(contacts[0]))
+    joint_order = np.arange(len(joints[0]))
+    for _ in range(iterations):
+        contact_pass(v, w, inv_mass, inv_I, contacts, contact_order, accumulate_impulses)
+        joint_pass(v, w, inv_mass, inv_I, joints, joint_order)
+
+
+@njit(cache=True, parallel=True)
+def solve_islands(iterations, v, w, inv_mass, inv_I, contacts, joints,
+                  contact_order, contact_bounds, joint_order, joint_bounds, accumulate_impulses):
+    """Same as solve, with the islands solved in parallel.
+
+    The contacts and joints of island k are contact_order[contact_bounds[k]:contact_bounds[k + 1]]
+    and the same for the joints. Islands share no dynamic bodies, so they write to
+    disjoint velocities. Static bodies may be shared, but their velocities are only
+    ever changed by zero.
+    """
+    for k in prange(len(contact_bounds) - 1):
+        island_contacts = contact_order[contact_bounds[k]:contact_bounds[k + 1]]
+        island_joints = joint_order[joint_bounds[k]:joint_bounds[k + 1]]
+        for _ in range(iterations):
+            contact_pass(v, w, inv_mass, inv_I, contacts, island_contacts, accumulate_impulses)
+            joint_pass(v, w, inv_mass, inv_I, joints, island_joints)
+
+
+@njit(cache=True)
+def _find(parent, i):
+    while parent[i] != i:
+        # path halving
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+@njit(cache=True)
+def island_labels(dynamic, body_1_idx, body_2_idx):
+    """Island of every constraint between body_1_idx and body_2_idx, found by union-find.
+
+    Constraints that share a dynamic body are in the same island. Static bodies do
+    not join islands. Returns the labels, numbered from 0 in order of appearance and
+    -1 for constraints between two static bodies, and the number of islands.
+    """
+    parent = np.arange(len(dynamic))
+    for k in range(len(body_1_idx)):
+        i1 = body_1_idx[k]
+        i2 = body_2_idx[k]
+        if dynamic[i1] and dynamic[i2]:
+            root_1 = _find(parent, i1)
+            root_2 = _find(parent, i2)
+            if root_1 != root_2:
+                parent[root_2] = root_1
+
+    island = np.full(len(dynamic), -1, dtype=np.intp)
+    num_islands = 0
+    labels = np.empty(len(body_1_idx), dtype=np.intp)
+    for k in range(len(body_1_idx)):
+        i = body_1_idx[k] if dynamic[body_1_idx[k]] else body_2_idx[k]
+        if dynamic[i]:
+            root = _find(parent, i)
+            if island[root] < 0:
+                island[root] = num_islands
+                num_islands += 1
+            labels[k] = island[root]
+        else:
+            labels[k] = -1
+    return labels, num_islands
+
+
+@njit(cache=True)
+def island_order(labels, num_islands):
+    """Indices of the constraints sorted by island, keeping their order within each
+    island, and the bounds of every island in them. Label -1 is left out.
+    """
+    bounds = np.zeros(num_islands + 1, dtype=np.intp)
+    for label in labels:
+        if label >= 0:
+            bounds[label + 1] += 1
+    for k in range(num_islands):
+        bounds[k + 1] += bounds[k]
+
+    order = np.empty(bounds[num_islands], dtype=np.intp)
+    fill = bounds[:num_islands].copy()
+    for i in range(len(labels)):
+        label = labels[i]
+        if label >= 0:
+            order[fill[label]] = i
+            fill[label] += 1
+    return order, bounds
+
+
+class ContactSolver:
+    """Pre-steps and solves the contacts of all arbiters on flat arrays.
+
+    With a compiled backend each iteration is one sequential Gauss-Seidel pass over
+    the contacts in arbiter order, the same as the per-arbiter solver. The Cython
+    extension `_impulse` is used if it is built, numba otherwise.
+
+    Without either, the contacts are sorted into batches in which every dynamic body
+    appears at most once, so the impulses of a batch do not interact and can be
+    applied with a handful of vector operations. Batches are solved one after the
+    other, which keeps the Gauss-Seidel character (only the contact order differs).
+    Static bodies may appear in several contacts of a batch since their velocities
+    never change.
+
+    Replaces `Arbiter.pre_step` and `Arbiter.apply_impulse`, the warm start is
+    applied separately by `warm_start`. The body velocities are updated in place in
+    the state arrays, use `store_impulses` to write the accumulated impulses back to
+    the contacts for warm starting.
+    """
+    def __init__(self, state: BodyArrays, arbiters: Sequence[Arbiter]) -> None:
+        contacts = []
+        body_1_idx = []
+        body_2_idx = []
+        friction = []
+        for arb in arbiters:
+            i1 = arb.body_1.index
+            i2 = arb.body_2.index
+            for c in arb.contacts:
+                contacts.append(c)
+                body_1_idx.append(i1)
+                body_2_idx.append(i2)
+                friction.append(arb.friction)
+
+        # views into the state arrays
+        self.state = state
+        self.velocity = state.velocities[:state.size]
+        self.angular_velocity = state.angular_velocities[:state.size]
+        self.inv_mass = state.inv_mass[:state.size]
+        self.inv_I = state.inv_I[:state.size]
+
+        if _impulse is None and not HAS_NUMBA:
+            colors = color_contacts(body_1_idx, body_2_idx, self.inv_mass > 0.0)
+            order, self.batches = color_batches(colors)
+            contacts = [contacts[i] for i in order]
+        else:
+            order = slice(None)
+            self.batches = []
+
+        self.contacts = contacts
+        self.body_1_idx = np.array(body_1_idx, dtype=np.intp)[order]
+        self.body_2_idx = np.array(body_2_idx, dtype=np.intp)[order]
+        # all float arrays share the dtype of the state arrays
+        dtype = self.velocity.dtype
+        self.friction = np.array(friction, dtype=dtype)[order]
+
+        self.position = np.array([c.position for c in contacts], dtype=dtype).reshape(-1, 2)
+        self.normal = np.array([c.normal for c in contacts], dtype=dtype).reshape(-1, 2)
+        self.tangent = np.stack((self.normal[:, 1], -self.normal[:, 0]), axis=1)
+        self.separation = np.array([c.separation for c in contacts], dtype=dtype)
+        self.Pn = np.array([c.Pn for c in contacts], dtype=dtype)
+        self.Pt = np.array([c.Pt for c in contacts], dtype=dtype)
+
+        self.inv_mass_1 = self.inv_mass[self.body_1_idx]
+        self.inv_mass_2 = self.inv_mass[self.body_2_idx]
+        self.inv_I_1 = self.inv_I[self.body_1_idx]
+        self.inv_I_2 = self.inv_I[self.body_2_idx]
+
+    @property
+    def num_contacts(self) -> int:
+        return len(self.contacts)
+
+    def pre_step(self, inv_dt: float) -> None:
+        i1 = self.body_1_idx
+        i2 = self.body_2_idx
+        positions = self.state.positions
+        normal = self.normal
+        tangent = self.tangent
+
+        r1 = self.r1 = self.position - positions[i1]
+        r2 = self.r2 = self.position - positions[i2]
+        r1_sq = np.einsum('ij,ij->i', r1, r1)
+        r2_sq = np.einsum('ij,ij->i', r2, r2)
+
+        # precompute normal mass, tangent mass, and bias, see Arbiter.pre_step
+        inv_mass = self.inv_mass_1 + self.inv_mass_2
+        rn1 = np.einsum('ij,ij->i', r1, normal)
+        rn2 = np.einsum('ij,ij->i', r2, normal)
+        k_normal = inv_mass + self.inv_I_1 * (r1_sq - rn1 * rn1) + self.inv_I_2 * (r2_sq - rn2 * rn2)
+        self.mass_normal = 1.0 / k_normal
+
+        rt1 = np.einsum('ij,ij->i', r1, tangent)
+        rt2 = np.einsum('ij,ij->i', r2, tangent)
+        k_tangent = inv_mass + self.inv_I_1 * (r1_sq - rt1 * rt1) + self.inv_I_2 * (r2_sq - rt2 * rt2)
+        self.mass_tangent = 1.0 / k_tangent
+
+        k_bias_factor = K_BIAS_FACTOR if POSITION_CORRECTION else 0.0
+        self.bias = -k_bias_factor * inv_dt * np.minimum(0.0, self.separation + K_ALLOWED_PENETRATION)
+
+    def warm_start_impulses(self) -> Optional[tuple]:
+        """(i1, i2, r1, r2, P) of the normal + friction impulse of every contact, see warm_start."""
+        if not ACCUMULATE_IMPULSES:
+            return None
+        P = self.Pn[:, None] * self.normal + self.Pt[:, None] * self.tangent
+        return self.body_1_idx, self.body_2_idx, self.r1, self.r2, P
+
+    def kernel_arrays(self) -> tuple:
+        return (self.body_1_idx, self.body_2_idx, self.normal, self.tangent, self.r1, self.r2,
+                self.mass_normal, self.mass_tangent, self.bias, self.friction, self.Pn, self.Pt)
+
+    def store_impulses(self) -> None:
+        for c, Pn, Pt in zip(self.contacts, self.Pn.tolist(), self.Pt.tolist()):
+            c.Pn = Pn
+            c.Pt = Pt
+
+    def apply_impulse(self) -> None:
+        if _impulse is not None:
+            _impulse.apply_impulse(self.velocity, self.angular_velocity,
+                                   self.body_1_idx, self.body_2_idx,
+                                   self.normal, self.tangent, self.r1, self.r2,
+                                   self.mass_normal, self.mass_tangent, self.bias,
+                                   self.friction, self.Pn, self.Pt,
+                                   self.inv_mass, self.inv_I, ACCUMULATE_IMPULSES)
+            return
+
+        if HAS_NUMBA:
+            contact_pass(self.velocity, self.angular_velocity, self.inv_mass, self.inv_I,
+                         self.kernel_arrays(), np.arange(self.num_contacts), ACCUMULATE_IMPULSES)
+            return
+
+        v = self.velocity
+        w = self.angular_velocity
+
+        for start, stop in self.batches:
+            i1 = self.body_1_idx[start:stop]
+            i2 = self.body_2_idx[start:stop]
+            r1 = self.r1[start:stop]
+            r2 = self.r2[start:stop]
+            normal = self.normal[start:stop]
+            tangent = self.tangent[start:stop]
+            inv_mass_1 = self.inv_mass_1[start:stop]
+            inv_mass_2 = self.inv_mass_2[start:stop]
+            inv_I_1 = self.inv_I_1[start:stop]
+            inv_I_2 = self.inv_I_2[start:stop]
+
+            # relative velocity at contact
+            dv = relative_velocity(v, w, i1, i2, r1, r2)
+
+            # compute normal impulse
+            vn = np.einsum('ij,ij->i', dv, normal)
+            d_Pn = self.mass_normal[start:stop] * (-vn + self.bias[start:stop])
+
+            if ACCUMULATE_IMPULSES:
+                # clamp the accumulated impulse
+                Pn_0 = self.Pn[start:stop].copy()
+                self.Pn[start:stop] = np.maximum(Pn_0 + d_Pn, 0.0)
+                d_Pn = self.Pn[start:stop] - Pn_0
+            else:
+                d_Pn = np.maximum(d_Pn, 0.0)
+
+            # apply contact impulse
+            Pn = d_Pn[:, None] * normal
+            v[i1] -= inv_mass_1[:, None] * Pn
+            w[i1] -= inv_I_1 * (r1[:, 0] * Pn[:, 1] - r1[:, 1] * Pn[:, 0])
+            v[i2] += inv_mass_2[:, None] * Pn
+            w[i2] += inv_I_2 * (r2[:, 0] * Pn[:, 1] - r2[:, 1] * Pn[:, 0])
+
+            # relative velocity at contact
+            dv = relative_velocity(v, w, i1, i2, r1, r2)
+
+            vt = np.einsum('ij,ij->i', dv, tangent)
+            d_Pt = self.mass_tangent[start:stop] * (-vt)
+
+            if ACCUMULATE_IMPULSES:
+                # compute friction impulse
+                max_Pt = self.friction[start:stop] * self.Pn[start:stop]
+
+                # clamp friction
+                Pt_0 = self.Pt[start:stop].copy()
+                self.Pt[start:stop] = np.clip(Pt_0 + d_Pt, -max_Pt, max_Pt)
+                d_Pt = self.Pt[start:stop] - Pt_0
+            else:
+                max_Pt = self.friction[start:stop] * d_Pn
+                d_Pt = np.clip(d_Pt, -max_Pt, max_Pt)
+
+            # apply contact impulses
+            Pt = d_Pt[:, None] * tangent
+            v[i1] -= inv_mass_1[:, None] * Pt
+            w[i1] -= inv_I_1 * (r1[:, 0] * Pt[:, 1] - r1[:, 1] * Pt[:, 0])
+            v[i2] += inv_mass_2[:, None] * Pt
+            w[i2] += inv_I_2 * (r2[:, 0] * Pt[:, 1] - r2[:, 1] * Pt[:, 0])
+
+
+class JointSolver:
+    """Pre-steps and solves all joints on flat arrays.
+
+    With numba each iteration is one compiled sequential pass over the joints. Without
+    it the joints are colored into batches like the contacts of ContactSolver, so every
+    batch is solved with a few vector operations while the batches keep the
+    Gauss-Seidel order between them. Solving all joints at once would be a Jacobi
+    iteration, which converges noticeably slower on chains such as the bridge.
+
+    Replaces `Joint.pre_step` and `Joint.apply_impulse`, the warm start is applied
+    separately by `warm_start`. Use `store_impulses` to write the accumulated
+    impulses back to the joints for warm starting.
+    """
+    def __init__(self, state: BodyArrays, joints: Sequence[Joint]) -> None:
+        # views into the state arrays
+        self.state = state
+        self.velocity = state.velocities[:state.size]
+        self.angular_velocity = state.angular_velocities[:state.size]
+        self.inv_mass = state.inv_mass[:state.size]
+        self.inv_I = state.inv_I[:state.size]
+        dtype = self.velocity.dtype
+
+        body_1_idx = [j.body_1.index for j in joints]
+        body_2_idx = [j.body_2.index for j in joints]
+        if not HAS_NUMBA:
+            colors = color_contacts(body_1_idx, body_2_idx, self.inv_mass > 0.0)
+            order, self.batches = color_batches(colors)
+            joints = [joints[i] for i in order]
+        else:
+            order = slice(None)
+            self.batches = []
+
+        self.joints = joints
+        self.body_1_idx = np.array(body_1_idx, dtype=np.intp)[order]
+        self.body_2_idx = np.array(body_2_idx, dtype=np.intp)[order]
+        self.local_anchor_1 = np.array([j.local_anchor_1 for j in self.joints], dtype=dtype).reshape(-1, 2)
+        self.local_anchor_2 = np.array([j.local_anchor_2 for j in self.joints], dtype=dtype).reshape(-1, 2)
+        self.softness = np.array([j.softness for j in self.joints], dtype=dtype)
+        self.bias_factor = np.array([j.bias_factor for j in self.joints], dtype=dtype)
+        self.P = np.array([j.P for j in self.joints], dtype=dtype).reshape(-1, 2)
+        self.bias = np.zeros_like(self.P)
+
+        self.inv_mass_1 = self.inv_mass[self.body_1_idx]
+        self.inv_mass_2 = self.inv_mass[self.body_2_idx]
+        self.inv_I_1 = self.inv_I[self.body_1_idx]
+        self.inv_I_2 = self.inv_I[self.body_2_idx]
+
+    @property
+    def num_joints(self) -> int:
+        return len(self.joints)
+
+    def pre_step(self, inv_dt: float) -> None:
+        i1 = self.body_1_idx
+        i2 = self.body_2_idx
+
+        # rotate the local anchors
+        r1 = self.r1 = _rotate(self.state.rotations[i1], self.local_anchor_1)
+        r2 = self.r2 = _rotate(self.state.rotations[i2], self.local_anchor_2)
+
+        # closed-form inverse of the symmetric K, see Joint.pre_step
+        inv_mass = self.inv_mass_1 + self.inv_mass_2
+        k00 = inv_mass + self.inv_I_1 * r1[:, 1] * r1[:, 1] + self.inv_I_2 * r2[:, 1] * r2[:, 1] + self.softness
+        k01 = -self.inv_I_1 * r1[:, 0] * r1[:, 1] - self.inv_I_2 * r2[:, 0] * r2[:, 1]
+        k11 = inv_mass + self.inv_I_1 * r1[:, 0] * r1[:, 0] + self.inv_I_2 * r2[:, 0] * r2[:, 0] + self.softness
+        det = k00 * k11 - k01 * k01
+        inv_det = np.divide(1.0, det, out=np.zeros_like(det), where=det != 0.0)
+        self.M00 = k11 * inv_det
+        self.M01 = -k01 * inv_det
+        self.M11 = k00 * inv_det
+
+        if POSITION_CORRECTION:
+            positions = self.state.positions
+            dp = positions[i2] + r2 - positions[i1] - r1
+            np.multiply(dp, -inv_dt * self.bias_factor[:, None], out=self.bias)
+        else:
+            self.bias.fill(0.0)
+
+        # M and bias are fixed for the iterations
+        bias = self.bias
+        self.M_bias = np.stack((self.M00 * bias[:, 0] + self.M01 * bias[:, 1],
+                                self.M01 * bias[:, 0] + self.M11 * bias[:, 1]), axis=1)
+
+        if not WARM_STARTING:
+            self.P.fill(0.0)
+
+    def warm_start_impulses(self) -> Optional[tuple]:
+        """(i1, i2, r1, r2, P) of the accumulated impulse of every joint, see warm_start."""
+        if not WARM_STARTING:
+            return None
+        return self.body_1_idx, self.body_2_idx, self.r1, self.r2, self.P
+
+    def kernel_arrays(self) -> tuple:
+        return (self.body_1_idx, self.body_2_idx, self.r1, self.r2,
+                self.M00, self.M01, self.M11, self.M_bias, self.softness, self.P)
+
+    def store_impulses(self) -> None:
+        for j, P in zip(self.joints, self.P):
+            j.P[:] = P
+
+    def apply_impulse(self) -> None:
+        v = self.velocity
+        w = self.angular_velocity
+
+        if HAS_NUMBA:
+            joint_pass(v, w, self.inv_mass, self.inv_I, self.kernel_arrays(), np.arange(self.num_joints))
+            return
+
+        for start, stop in self.batches:
+            i1 = self.body_1_idx[start:stop]
+            i2 = self.body_2_idx[start:stop]
+            r1 = self.r1[start:stop]
+            r2 = self.r2[start:stop]
+            P = self.P[start:stop]
+            inv_mass_1 = self.inv_mass_1[start:stop]
+            inv_mass_2 = self.inv_mass_2[start:stop]
+            inv_I_1 = self.inv_I_1[start:stop]
+            inv_I_2 = self.inv_I_2[start:stop]
+
+            dv = relative_velocity(v, w, i1, i2, r1, r2)
+
+            # impulse = M @ (bias - dv - softness * P) = M @ bias - M @ (dv + softness * P)
+            rhs = dv + self.softness[start:stop, None] * P
+            M00 = self.M00[start:stop]
+            M01 = self.M01[start:stop]
+            M11 = self.M11[start:stop]
+            M_rhs = np.stack((M00 * rhs[:, 0] + M01 * rhs[:, 1],
+                              M01 * rhs[:, 0] + M11 * rhs[:, 1]), axis=1)
+            impulse = self.M_bias[start:stop] - M_rhs
+
+            v[i1] -= inv_mass_1[:, None] * impulse
+            w[i1] -= inv_I_1 * (r1[:, 0] * impulse[:, 1] - r1[:, 1] * impulse[:, 0])
+            v[i2] += inv_mass_2[:, None] * impulse
+            w[i2] += inv_I_2 * (r2[:, 0] * impulse[:, 1] - r2[:, 1] * impulse[:, 0])
+
+            P += impulse
+
+
+def warm_start(state: BodyArrays, solvers: Sequence) -> None:
+    """Apply the accumulated impulses of the pre-stepped solvers to the bodies.
+
+    With numba this is one compiled pass per solver. Otherwise the impulses of all
+    solvers are concatenated and scattered with a single np.add.at per state array,
+    instead of four per solver. The warm start is a plain sum, so the order in which
+    the impulses are added does not matter.
+    """
+    impulses = [imp for imp in (solver.warm_start_impulses() for solver in solvers)
+                if imp is not None and len(imp[0])]
+    if not impulses:
+        return
+
+    if HAS_NUMBA:
+        for i1, i2, r1, r2, P in impulses:
+            warm_start_pass(state.velocities, state.angular_velocities, state.inv_mass, state.inv_I,
+                            i1, i2, r1, r2, P)
+        return
+
+    i1, i2, r1, r2, P = (np.concatenate(arrays) for arrays in zip(*impulses))
+    # one entry per body and impulse: body 1 receives -P, body 2 receives +P
+    idx = np.concatenate((i1, i2))
+    r = np.concatenate((r1, r2))
+    P = np.concatenate((-P, P))
+    np.add.at(state.velocities, idx, state.inv_mass[idx, None] * P)
+    np.add.at(state.angular_velocities, idx, state.inv_I[idx] * (r[:, 0] * P[:, 1] - r[:, 1] * P[:, 0]))
+
+
+@functools.lru_cache(maxsize=None)
+def _no_joints(dtype: np.dtype) -> tuple:
+    # the kernel arrays of an empty JointSolver, for scenes solved without one
+    idx = np.zeros(0, dtype=np.intp)
+    vec = np.zeros((0, 2), dtype=dtype)
+    scalar = np.zeros(0, dtype=dtype)
+    return idx, idx, vec, vec, scalar, scalar, scalar, vec, scalar, vec
+
+
+def solve_iterations(iterations: int, contact_solver: ContactSolver,
+                     joint_solver: Optional[JointSolver] = None) -> None:
+    """Run the impulse iterations of the pre-stepped solvers.
+
+    With numba, and unless the Cython kernel takes over the contacts, all iterations
+    run in a single compiled call. With PARALLEL_ISLANDS and several numba threads the
+    bodies are split into islands that do not touch each other, and the islands are
+    solved in parallel.
+    """
+    if HAS_NUMBA and _impulse is None:
+        joints = joint_solver.kernel_arrays() if joint_solver is not None else _no_joints(contact_solver.velocity.dtype)
+        contacts = contact_solver.kernel_arrays()
+        args = (contact_solver.velocity, contact_solver.angular_velocity,
+                contact_solver.inv_mass, contact_solver.inv_I, contacts, joints)
+
+        if SOLVE_ISLANDS:
+            num_contacts = len(contacts[0])
+            labels, num_islands = island_labels(contact_solver.inv_mass > 0.0,
+                                                np.concatenate((contacts[0], joints[0])),
+                                                np.concatenate((contacts[1], joints[1])))
+            if num_islands > 1:
+                contact_order, contact_bounds = island_order(labels[:num_contacts], num_islands)
+                joint_order, joint_bounds = island_order(labels[num_contacts:], num_islands)
+                solve_islands(iterations, *args, contact_order, contact_bounds,
+                              joint_order, joint_bounds, ACCUMULATE_IMPULSES)
+                return
+
+        solve(iterations, *args, ACCUMULATE_IMPULSES)
+        return
+
+    for _ in range(iterations):
+        contact_solver.apply_impulse()
+        if joint_solver is not None:
+            joint_solver.apply_impulse()
@@ -11,48 +11,149 @@ It is provided "as is" without express or implied warranty.
 
 
 import numpy as np
-from typing import List, Dict, Union, Sequence
+from typing import List, Dict, Tuple, Union, Sequence
 
 from arbiter import Arbiter, ArbiterKey
-from body import Body
+from body import Body, BodyArrays, DTYPE
+from broadphase import GRID_MIN_BODIES, IncrementalSweepAndPrune, SpatialHashGrid, sweep_and_prune
 from joint import Joint
+from settings import BATCH_CONTACTS, BATCH_JOINTS, BROADPHASE, IMPULSE_CACHE_STEPS, WARM_STARTING
+from solver import JOINT_BATCH_MIN, ContactSolver, JointSolver, solve_iterations, warm_start
 
 
 class World:
     def __init__(self, gravity:  Union[np.ndarray, Sequence[float]], iterations: int) -> None:
-        self.gravity = np.asarray(gravity)
+        self.gravity = gravity
         self.iterations = iterations
 
         self.clear()
 
+    @property
+    def gravity(self) -> np.ndarray:
+        return self._gravity
+
+    @gravity.setter
+    def gravity(self, gravity: Union[np.ndarray, Sequence[float]]) -> None:
+        # converted once here rather than broadcast from a list in every step, and
+        #  copied so that the world does not share the caller's array
+        self._gravity = np.array(gravity, dtype=DTYPE).reshape(2)
+
     def add_body(self, body: Body) -> None:
+        # the rows of the state arrays follow the order of self.bodies
+        body.move_state(self.body_state)
         self.bodies.append(body)
 
+    def remove_body(self, body: Body) -> None:
+        """Remove a body along with its arbiters, joints and cached impulses.
+
+        The body keeps its state.
+        """
+        idx = body.index
+        if idx >= len(self.bodies) or self.bodies[idx] is not body:
+            raise ValueError('body is not in this world')
+        body.detach_state()
+
+        del self.bodies[idx]
+        self.body_state.remove(idx)
+        for b in self.bodies[idx:]:
+            b.shift_index(-1)
+
+        self.arbiters = {key: arb for key, arb in self.arbiters.items()
+                         if arb.body_1 is not body and arb.body_2 is not body}
+        self.joints = [j for j in self.joints if j.body_1 is not body and j.body_2 is not body]
+
+        # a new body may reuse the id of the removed one
+        body_id = id(body)
+        self.impulse_cache = {k: v for k, v in self.impulse_cache.items()
+                              if k[0] != body_id and k[1] != body_id}
+
     def add_joint(self, joint: Joint) -> None:
         self.joints.append(joint)
 
     def clear(self) -> None:
         self.bodies: List[Body] = []
+        self.body_state = BodyArrays(capacity=16, dtype=DTYPE)
+        # (N, 2) bounding boxes of all bodies, refreshed by update_aabbs
+        self.aabb_min = np.zeros((0, 2), dtype=DTYPE)
+        self.aabb_max = np.zeros((0, 2), dtype=DTYPE)
+        # scratch arrays of the integration in step, grown with the state arrays
+        self._dv = np.zeros((0, 2), dtype=DTYPE)
+        self._dw = np.zeros(0, dtype=DTYPE)
         self.joints: List[Joint] = []
         self.arbiters: Dict[ArbiterKey, Arbiter] = {}
+        self.grid = SpatialHashGrid()
+        self.incremental_sap = IncrementalSweepAndPrune()
+
+        # accumulated impulses (Pn, Pt, Pnb) and the last step seen of every contact by
+        #  (arbiter key, packed edges), kept for a few steps after the contact disappears to
+        #  warm start it if it comes back
+        self.impulse_cache: Dict[Tuple[int, int, int], Tuple[float, float, float, int]] = {}
+        self.step_count = 0
+
+    def update_aabbs(self) -> None:
+        """Recompute the bounding boxes of all bodies at once, same as Body.update_aabb."""
+        n = self.body_state.size
+        positions = self.body_state.positions[:n]
+        half_widths = self.body_state.half_widths[:n]
+        rotations = self.body_state.rotations[:n]
+        c = np.abs(np.cos(rotations))
+        s = np.abs(np.sin(rotations))
+
+        # abs(R) @ half_width
+        extent = np.stack((c * half_widths[:, 0] + s * half_widths[:, 1],
+                           s * half_widths[:, 0] + c * half_widths[:, 1]), axis=1)
+        self.aabb_min = positions - extent
+        self.aabb_max = positions + extent
+
+        for b, aabb_min, aabb_max in zip(self.bodies, self.aabb_min.tolist(), self.aabb_max.tolist()):
+            b.aabb_min = tuple(aabb_min)
+            b.aabb_max = tuple(aabb_max)
 
     def broadphase(self) -> None:
-        # O(n^2) broad-phase
-        for i, bi in enumerate(self.bodies):
-            for j, bj in enumerate(self.bodies[i+1:]):
-                if bi.inv_mass == 0.0 and bj.inv_mass == 0.0:
-                    continue
-
-                new_arb = Arbiter(bi, bj)
-                key = ArbiterKey(bi, bj)
-
-                if new_arb.num_contacts > 0:
-                    if key not in self.arbiters:
-                        self.arbiters[key] = new_arb
-                    else:
-                        self.arbiters[key].update(new_arb.contacts)
-                elif key in self.arbiters:
-                    self.arbiters.pop(key)
+        self.update_aabbs()
+        static = self.body_state.inv_mass[:self.body_state.size] == 0.0
+
+        if BROADPHASE == 'grid' and len(self.bodies) >= GRID_MIN_BODIES:
+            pairs = self.grid.pairs(self.bodies, self.aabb_min, self.aabb_max, static)
+        elif BROADPHASE == 'incremental':
+            pairs = self.incremental_sap.pairs(self.bodies)
+        else:
+            pairs = sweep_and_prune(self.bodies, self.aabb_min, self.aabb_max, static)
+
+        arbiters: Dict[ArbiterKey, Arbiter] = {}
+        for bi, bj in pairs:
+            new_arb = Arbiter(bi, bj)
+
+            if new_arb.num_contacts > 0:
+                key = (id(bi), id(bj)) if id(bi) < id(bj) else (id(bj), id(bi))
+                arb = self.arbiters.get(key)
+                if arb is None:
+                    if WARM_STARTING:
+                        self.restore_impulses(key, new_arb)
+                    arbiters[key] = new_arb
+                else:
+                    arb.update(new_arb.contacts)
+                    arbiters[key] = arb
+
+        # arbiters of pairs that are no longer touching are dropped
+        self.arbiters = arbiters
+
+    def restore_impulses(self, key: ArbiterKey, arb: Arbiter) -> None:
+        for c in arb.contacts:
+            impulses = self.impulse_cache.get((key[0], key[1], c.edges.packed))
+            if impulses is not None:
+                c.Pn, c.Pt, c.Pnb, _ = impulses
+
+    def cache_impulses(self) -> None:
+        step = self.step_count
+        for key, arb in self.arbiters.items():
+            for c in arb.contacts:
+                self.impulse_cache[(key[0], key[1], c.edges.packed)] = (c.Pn, c.Pt, c.Pnb, step)
+
+        # drop stale entries once in a while rather than scanning the cache every step
+        if step % IMPULSE_CACHE_STEPS == 0:
+            self.impulse_cache = {k: v for k, v in self.impulse_cache.items()
+                                  if step - v[3] <= IMPULSE_CACHE_STEPS}
 
     def step(self, dt: float) -> None:
         inv_dt = 1.0 / dt if dt > 0 else 0.0
@@ -60,33 +161,84 @@ class World:
         # determine overlapping bodies and update contact points
         self.broadphase()
 
-        # integrate forces
-        for b in self.bodies:
-            if b.inv_mass == 0:
-                continue
-
-            b.velocity += dt * (self.gravity + b.inv_mass * b.force)
-            b.angular_velocity += dt * b.inv_I * b.torque
+        n = self.body_state.size
+        positions = self.body_state.positions[:n]
+        velocities = self.body_state.velocities[:n]
+        rotations = self.body_state.rotations[:n]
+        angular_velocities = self.body_state.angular_velocities[:n]
+        inv_mass = self.body_state.inv_mass[:n]
+
+        if len(self._dv) < n:
+            self._dv = np.zeros((self.body_state.capacity, 2), dtype=DTYPE)
+            self._dw = np.zeros(self.body_state.capacity, dtype=DTYPE)
+        dv = self._dv[:n]
+        dw = self._dw[:n]
+
+        # integrate forces, static bodies get no gravity
+        #  all in place on the scratch arrays, without masked copies of the state
+        np.multiply(inv_mass[:, None], self.body_state.forces[:n], out=dv)
+        np.add(dv, self.gravity, out=dv, where=(inv_mass > 0.0)[:, None])
+        dv *= dt
+        velocities += dv
+        np.multiply(self.body_state.inv_I[:n], self.body_state.torques[:n], out=dw)
+        dw *= dt
+        angular_velocities += dw
+
+        # the batched solvers work on flat arrays, the others on the bodies
+        contact_solver = ContactSolver(self.body_state, list(self.arbiters.values())) if BATCH_CONTACTS else None
+        joint_solver = None
+        if BATCH_JOINTS and len(self.joints) >= JOINT_BATCH_MIN:
+            joint_solver = JointSolver(self.body_state, self.joints)
 
         # perform pre-steps
-        for arb in self.arbiters.values():
-            arb.pre_step(inv_dt)
-
-        for joint in self.joints:
-            joint.pre_step(inv_dt)
-
-        # perform iterations
-        for _ in range(self.iterations):
+        if contact_solver is not None:
+            contact_solver.pre_step(inv_dt)
+        else:
             for arb in self.arbiters.values():
-                arb.apply_impulse()
+                arb.pre_step(inv_dt)
 
+        if joint_solver is not None:
+            joint_solver.pre_step(inv_dt)
+        else:
             for joint in self.joints:
-                joint.apply_impulse()
+                joint.pre_step(inv_dt)
+
+        # the batched solvers apply their warm start together
+        batched = [solver for solver in (contact_solver, joint_solver) if solver is not None]
+        if batched:
+            warm_start(self.body_state, batched)
+
+        # perform iterations
+        if contact_solver is not None and (joint_solver is not None or not self.joints):
+            solve_iterations(self.iterations, contact_solver, joint_solver)
+        else:
+            for _ in range(self.iterations):
+                if contact_solver is not None:
+                    contact_solver.apply_impulse()
+                else:
+                    for arb in self.arbiters.values():
+                        arb.apply_impulse()
+
+                if joint_solver is not None:
+                    joint_solver.apply_impulse()
+                else:
+                    for joint in self.joints:
+                        joint.apply_impulse()
+
+        if contact_solver is not None:
+            contact_solver.store_impulses()
+        if joint_solver is not None:
+            joint_solver.store_impulses()
 
         # integrate velocities
-        for b in self.bodies:
-            b.position += dt * b.velocity
-            b.rotation += dt * b.angular_velocity
+        np.multiply(velocities, dt, out=dv)
+        positions += dv
+        np.multiply(angular_velocities, dt, out=dw)
+        rotations += dw
+
+        self.body_state.forces[:n].fill(0.0)
+        self.body_state.torques[:n].fill(0.0)
 
-            b.force = np.zeros(2, dtype=b.force.dtype)
-            b.torque = 0.0
+        if WARM_STARTING:
+            self.cache_impulses()
+        self.step_count += 1